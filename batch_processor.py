@@ -7,28 +7,256 @@
 
 import os
 import argparse
-import glob
+import logging
+import multiprocessing
+import string
+import threading
 from pathlib import Path
-from video_background_remover import VideoBackgroundRemover, setup_logger
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from video_background_remover import (DEVICE_CHOICES, device_available, get_remover, resolve_device,
+                                      setup_logger)
 import time
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = setup_logger()
 
+# 默认支持的视频文件扩展名
+_DEFAULT_VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+
+# 支持多个线程同时在同一会话上推理的设备（DirectML、CoreML后端不支持并发Run）
+_SHARED_SESSION_DEVICES = frozenset({'cuda'})
+
+def _init_worker():
+    """进程池初始化：每个工作进程只用单线程推理，避免多进程下线程超额订阅"""
+    os.environ['OMP_NUM_THREADS'] = '1'
+
+def _process_video_worker(video_path, output_base_dir, create_webm, model_name, max_frames,
+                          cache_interval=1, batch_size=8, quantize=False, save_intermediate=False,
+                          device='cpu', fp16=False):
+    """
+    进程池中处理单个视频（顶层函数，可被pickle）
+    
+    Args:
+        video_path (str): 视频文件路径
+        output_base_dir (str): 输出基础目录
+        create_webm (bool): 是否创建WebM格式
+        model_name (str): AI模型名称
+        max_frames (int): 最大处理帧数
+        cache_interval (int): 遮罩复用的关键帧间隔
+        batch_size (int): 每次模型推理的帧数
+        quantize (bool): 是否使用INT8量化模型
+        save_intermediate (bool): 是否保存中间帧图片
+        device (str): 推理设备
+        fp16 (bool): 硬件加速推理时是否使用FP16模型
+        
+    Returns:
+        dict: 处理结果
+    """
+    remover = get_remover(model_name, quantize, device, fp16)
+    return process_single_video(remover, video_path, output_base_dir,
+                                create_webm, max_frames, cache_interval,
+                                batch_size, save_intermediate)
+
+def process_single_video(remover, video_path, output_base_dir, create_webm=True, max_frames=None,
+                         cache_interval=1, batch_size=8, save_intermediate=False):
+    """
+    处理单个视频文件
+    
+    Args:
+        remover (VideoBackgroundRemover): 背景移除器
+        video_path (str): 视频文件路径
+        output_base_dir (str): 输出基础目录
+        create_webm (bool): 是否创建WebM格式
+        max_frames (int): 最大处理帧数
+        cache_interval (int): 遮罩复用的关键帧间隔
+        batch_size (int): 每次模型推理的帧数
+        save_intermediate (bool): 是否保存中间帧图片
+        
+    Returns:
+        dict: 处理结果
+    """
+    video_name = Path(video_path).stem
+    output_dir = os.path.join(output_base_dir, video_name)
+    
+    logger.info(f"开始处理: {video_path}")
+    start_time = time.time()
+    
+    try:
+        result = remover.process_video(
+            input_video=video_path,
+            output_dir=output_dir,
+            max_frames=max_frames,
+            create_webm=create_webm,
+            cache_interval=cache_interval,
+            batch_size=batch_size,
+            save_intermediate=save_intermediate
+        )
+        
+        end_time = time.time()
+        processing_time = end_time - start_time
+        
+        result.update({
+            'status': 'success',
+            'processing_time': processing_time,
+            'video_name': video_name
+        })
+        
+        logger.info(f"完成处理: {video_name} (耗时: {processing_time:.2f}秒)")
+        
+    except Exception as e:
+        end_time = time.time()
+        processing_time = end_time - start_time
+        
+        result = {
+            'status': 'failed',
+            'error': str(e),
+            'processing_time': processing_time,
+            'video_name': video_name,
+            'input_video': video_path,
+            'output_dir': output_dir
+        }
+        
+        logger.error(f"处理失败: {video_name} - {e}")
+    
+    return result
+
+# HTML报告模板，模块加载时解析一次
+_HTML_HEADER_TEMPLATE = string.Template("""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>批量视频处理报告</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+        .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; text-align: center; }
+        .summary { background: #e8f4fd; padding: 15px; border-radius: 5px; margin: 20px 0; }
+        .stats { display: flex; justify-content: space-around; margin: 20px 0; }
+        .stat-item { text-align: center; padding: 10px; }
+        .stat-number { font-size: 2em; font-weight: bold; color: #2196F3; }
+        .stat-label { color: #666; }
+        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        th, td { padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }
+        th { background-color: #f8f9fa; font-weight: bold; }
+        .success { color: #4CAF50; font-weight: bold; }
+        .failed { color: #f44336; font-weight: bold; }
+        .progress-bar { width: 100%; height: 20px; background-color: #f0f0f0; border-radius: 10px; overflow: hidden; }
+        .progress-fill { height: 100%; background-color: #4CAF50; transition: width 0.3s ease; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>批量视频背景移除处理报告</h1>
+        
+        <div class="summary">
+            <h3>处理概要</h3>
+            <p><strong>处理时间:</strong> $timestamp</p>
+            <p><strong>使用模型:</strong> $model_name</p>
+            <p><strong>最大帧数限制:</strong> $max_frames</p>
+            <p><strong>总处理时间:</strong> $total_time 秒</p>
+        </div>
+        
+        <div class="stats">
+            <div class="stat-item">
+                <div class="stat-number">$total</div>
+                <div class="stat-label">总文件数</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number success">$success</div>
+                <div class="stat-label">成功处理</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number failed">$failed</div>
+                <div class="stat-label">处理失败</div>
+            </div>
+        </div>
+        
+        <div class="progress-bar">
+            <div class="progress-fill" style="width: $success_rate%"></div>
+        </div>
+        <p style="text-align: center; margin-top: 10px;">成功率: $success_rate%</p>
+        
+        <h3>详细结果</h3>
+        <table>
+            <thead>
+                <tr>
+                    <th>视频名称</th>
+                    <th>状态</th>
+                    <th>处理时间</th>
+                    <th>帧数</th>
+                    <th>分辨率</th>
+                    <th>帧率</th>
+                    <th>备注</th>
+                </tr>
+            </thead>
+            <tbody>
+""")
+
+_HTML_ROW_TEMPLATE = string.Template("""
+                <tr>
+                    <td>$name</td>
+                    <td class="$status_class">$status_text</td>
+                    <td>${processing_time}s</td>
+                    <td>$frame_count</td>
+                    <td>$resolution</td>
+                    <td>$fps</td>
+                    <td>$note</td>
+                </tr>
+""")
+
+_HTML_FOOTER = """
+            </tbody>
+        </table>
+    </div>
+</body>
+</html>
+"""
+
 class BatchVideoProcessor:
     """批量视频处理器"""
     
-    def __init__(self, model_name='u2net', max_frames=None):
+    def __init__(self, model_name='u2net', max_frames=None, num_workers=1, cache_interval=1,
+                 batch_size=8, quantize=False, save_intermediate=False, device='cpu', fp16=False):
         """
         初始化批量处理器
         
         Args:
             model_name (str): AI模型名称
             max_frames (int): 每个视频的最大处理帧数
+            num_workers (int): 并行处理的视频数，0表示自动（CPU核心数的一半）
+            cache_interval (int): 遮罩复用的关键帧间隔，1表示每帧都运行模型
+            batch_size (int): 每次模型推理的帧数
+            quantize (bool): 是否使用INT8动态量化模型（CPU推理更快）
+            save_intermediate (bool): 是否保存原始帧和处理后的帧图片（用于调试）
+            device (str): 推理设备，见 DEVICE_CHOICES
+            fp16 (bool): 硬件加速推理时是否使用FP16模型
         """
         self.model_name = model_name
         self.max_frames = max_frames
-        self.remover = VideoBackgroundRemover(model_name=model_name)
+        self.cache_interval = cache_interval
+        self.batch_size = batch_size
+        self.quantize = quantize
+        self.save_intermediate = save_intermediate
+        self.device = resolve_device(device)
+        self.fp16 = fp16
+        if not num_workers:
+            num_workers = max(1, (os.cpu_count() or 1) // 2)
+        self.num_workers = num_workers
+        # 硬件后端不可用时回退到CPU；在加载任何模型之前确定并行方式
+        if not device_available(self.device):
+            logger.warning(f"{self.device} 推理后端不可用，使用CPU推理")
+            self.device = 'cpu'
+        # CPU多进程模式下由各工作进程自行加载模型，当前进程不加载；硬件加速时多个线程共享同一个模型
+        self.remover = None
+        if num_workers == 1 or self.device != 'cpu':
+            self.remover = get_remover(model_name, quantize, self.device, fp16)
         self.results = []
     
     def find_video_files(self, input_dir, extensions=None):
@@ -37,28 +265,34 @@ class BatchVideoProcessor:
         
         Args:
             input_dir (str): 输入目录
-            extensions (list): 支持的文件扩展名
+            extensions (tuple): 支持的文件扩展名，为None时使用 _DEFAULT_VIDEO_EXTS
             
         Returns:
             list: 视频文件路径列表
         """
-        if extensions is None:
-            extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-        
         video_files = []
-        input_path = Path(input_dir)
         
-        if not input_path.exists():
+        if not os.path.isdir(input_dir):
             logger.error(f"输入目录不存在: {input_dir}")
             return video_files
         
-        for ext in extensions:
-            pattern = f"**/*{ext}"
-            files = list(input_path.glob(pattern))
-            video_files.extend([str(f) for f in files])
-        
-        # 去重并排序
-        video_files = sorted(list(set(video_files)))
+        # 单次遍历目录树，按扩展名精确匹配（集合查找）
+        exts = frozenset(ext.lower() for ext in extensions or _DEFAULT_VIDEO_EXTS)
+        stack = [input_dir]
+        while stack:
+            current_dir = stack.pop()
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in exts:
+                            video_files.append(entry.path)
+            except OSError as e:
+                # 无权限等无法读取的子目录跳过，不影响其余目录
+                logger.warning(f"无法读取目录，已跳过: {current_dir} ({e})")
+        
+        video_files.sort()
         logger.info(f"找到 {len(video_files)} 个视频文件")
         
         return video_files
@@ -75,47 +309,12 @@ class BatchVideoProcessor:
         Returns:
             dict: 处理结果
         """
-        video_name = Path(video_path).stem
-        output_dir = os.path.join(output_base_dir, video_name)
+        if self.remover is None:
+            self.remover = get_remover(self.model_name, self.quantize, self.device, self.fp16)
         
-        logger.info(f"开始处理: {video_path}")
-        start_time = time.time()
-        
-        try:
-            result = self.remover.process_video(
-                input_video=video_path,
-                output_dir=output_dir,
-                max_frames=self.max_frames,
-                create_webm=create_webm
-            )
-            
-            end_time = time.time()
-            processing_time = end_time - start_time
-            
-            result.update({
-                'status': 'success',
-                'processing_time': processing_time,
-                'video_name': video_name
-            })
-            
-            logger.info(f"完成处理: {video_name} (耗时: {processing_time:.2f}秒)")
-            
-        except Exception as e:
-            end_time = time.time()
-            processing_time = end_time - start_time
-            
-            result = {
-                'status': 'failed',
-                'error': str(e),
-                'processing_time': processing_time,
-                'video_name': video_name,
-                'input_video': video_path,
-                'output_dir': output_dir
-            }
-            
-            logger.error(f"处理失败: {video_name} - {e}")
-        
-        return result
+        return process_single_video(self.remover, video_path, output_base_dir,
+                                    create_webm, self.max_frames, self.cache_interval,
+                                    self.batch_size, self.save_intermediate)
     
     def process_batch(self, input_dir, output_dir, create_webm=True, extensions=None):
         """
@@ -125,7 +324,7 @@ class BatchVideoProcessor:
             input_dir (str): 输入目录
             output_dir (str): 输出目录
             create_webm (bool): 是否创建WebM格式
-            extensions (list): 支持的文件扩展名
+            extensions (tuple): 支持的文件扩展名，为None时使用 _DEFAULT_VIDEO_EXTS
             
         Returns:
             dict: 批处理结果统计
@@ -145,11 +344,21 @@ class BatchVideoProcessor:
         # 处理每个视频
         total_start_time = time.time()
         
-        for i, video_path in enumerate(video_files, 1):
-            logger.info(f"\n=== 处理进度: {i}/{len(video_files)} ===")
-            
-            result = self.process_single_video(video_path, output_dir, create_webm)
-            self.results.append(result)
+        parallel = self.num_workers > 1 and len(video_files) > 1
+        if parallel and self.device not in _SHARED_SESSION_DEVICES and self.device != 'cpu':
+            logger.info(f"{self.device} 推理会话不支持多线程同时推理，逐个处理视频")
+            parallel = False
+        
+        if parallel and self.device in _SHARED_SESSION_DEVICES:
+            self.results.extend(self._process_threaded(video_files, output_dir, create_webm))
+        elif parallel:
+            self.results.extend(self._process_parallel(video_files, output_dir, create_webm))
+        else:
+            for i, video_path in enumerate(video_files, 1):
+                logger.info(f"\n=== 处理进度: {i}/{len(video_files)} ===")
+                
+                result = self.process_single_video(video_path, output_dir, create_webm)
+                self.results.append(result)
         
         total_end_time = time.time()
         total_time = total_end_time - total_start_time
@@ -177,6 +386,88 @@ class BatchVideoProcessor:
         
         return stats
     
+    def _process_parallel(self, video_files, output_dir, create_webm):
+        """
+        使用进程池并行处理多个视频，每个工作进程加载自己的模型
+        
+        Args:
+            video_files (list): 视频文件路径列表
+            output_dir (str): 输出目录
+            create_webm (bool): 是否创建WebM格式
+            
+        Returns:
+            list: 按输入顺序排列的处理结果
+        """
+        max_workers = min(self.num_workers, len(video_files))
+        logger.info(f"使用 {max_workers} 个进程并行处理")
+        
+        results = {}
+        # 当前进程可能已加载过模型、启动了numba/ONNX Runtime的线程池（不支持fork），工作进程用spawn方式创建
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as ex:
+            futures = {
+                ex.submit(_process_video_worker, video_path, output_dir, create_webm,
+                          self.model_name, self.max_frames, self.cache_interval,
+                          self.batch_size, self.quantize, self.save_intermediate,
+                          self.device, self.fp16): video_path
+                for video_path in video_files
+            }
+            
+            for i, future in enumerate(as_completed(futures), 1):
+                video_path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 工作进程异常（如模型加载失败）
+                    video_name = Path(video_path).stem
+                    result = {
+                        'status': 'failed',
+                        'error': str(e),
+                        'processing_time': 0.0,
+                        'video_name': video_name,
+                        'input_video': video_path,
+                        'output_dir': os.path.join(output_dir, video_name)
+                    }
+                    logger.error(f"处理失败: {video_name} - {e}")
+                
+                results[video_path] = result
+                logger.info(f"=== 处理进度: {i}/{len(video_files)} ===")
+        
+        return [results[video_path] for video_path in video_files]
+    
+    def _process_threaded(self, video_files, output_dir, create_webm):
+        """
+        GPU推理时使用线程池并行处理多个视频：所有线程共享同一个CUDA会话，
+        避免每个进程各自创建CUDA上下文；ORT推理期间释放GIL，
+        各线程的解码、预处理和编码可与其他视频的GPU推理重叠
+        
+        Args:
+            video_files (list): 视频文件路径列表
+            output_dir (str): 输出目录
+            create_webm (bool): 是否创建WebM格式
+            
+        Returns:
+            list: 按输入顺序排列的处理结果
+        """
+        max_workers = min(self.num_workers, len(video_files))
+        logger.info(f"使用 {max_workers} 个线程共享 {self.remover.device} 推理会话并行处理")
+        
+        results = {}
+        lock = threading.Lock()
+        
+        def worker(video_path):
+            result = self.process_single_video(video_path, output_dir, create_webm)
+            with lock:
+                results[video_path] = result
+                logger.info(f"=== 处理进度: {len(results)}/{len(video_files)} ===")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            # process_single_video内部已捕获处理异常，这里只需等待全部完成
+            list(ex.map(worker, video_files))
+        
+        return [results[video_path] for video_path in video_files]
+    
     def save_report(self, output_dir, stats):
         """
         保存处理报告
@@ -198,34 +489,34 @@ class BatchVideoProcessor:
                 'failed': stats['failed'],
                 'total_processing_time': stats['total_time']
             },
-            'results': []
+            # 每个文件的处理结果
+            'results': [
+                {
+                    'video_name': result['video_name'],
+                    'status': result['status'],
+                    'processing_time': result['processing_time'],
+                    **({
+                        'frame_count': result.get('frame_count', 0),
+                        'fps': result.get('fps', 0),
+                        'resolution': result.get('resolution', [0, 0]),
+                        'output_mp4': result.get('output_mp4', ''),
+                        'output_webm': result.get('output_webm', '')
+                    } if result['status'] == 'success' else {
+                        'error': result.get('error', '')
+                    })
+                }
+                for result in stats['results']
+            ]
         }
         
-        # 添加每个文件的处理结果
-        for result in stats['results']:
-            result_info = {
-                'video_name': result['video_name'],
-                'status': result['status'],
-                'processing_time': result['processing_time']
-            }
-            
-            if result['status'] == 'success':
-                result_info.update({
-                    'frame_count': result.get('frame_count', 0),
-                    'fps': result.get('fps', 0),
-                    'resolution': result.get('resolution', [0, 0]),
-                    'output_mp4': result.get('output_mp4', ''),
-                    'output_webm': result.get('output_webm', '')
-                })
-            else:
-                result_info['error'] = result.get('error', '')
-            
-            report_data['results'].append(result_info)
-        
-        # 保存报告
+        # 保存报告（优先使用orjson，未安装时回退到标准库json）
         try:
-            with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                with open(report_path, 'wb') as f:
+                    f.write(orjson.dumps(report_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report_data, f, indent=2, ensure_ascii=False)
             logger.info(f"处理报告已保存: {report_path}")
         except Exception as e:
             logger.error(f"保存报告失败: {e}")
@@ -239,118 +530,52 @@ class BatchVideoProcessor:
             stats (dict): 统计信息
         """
         html_path = os.path.join(output_dir, 'batch_processing_report.html')
-        
-        html_content = f"""
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>批量视频处理报告</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-        .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        h1 {{ color: #333; text-align: center; }}
-        .summary {{ background: #e8f4fd; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-        .stats {{ display: flex; justify-content: space-around; margin: 20px 0; }}
-        .stat-item {{ text-align: center; padding: 10px; }}
-        .stat-number {{ font-size: 2em; font-weight: bold; color: #2196F3; }}
-        .stat-label {{ color: #666; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-        th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }}
-        th {{ background-color: #f8f9fa; font-weight: bold; }}
-        .success {{ color: #4CAF50; font-weight: bold; }}
-        .failed {{ color: #f44336; font-weight: bold; }}
-        .progress-bar {{ width: 100%; height: 20px; background-color: #f0f0f0; border-radius: 10px; overflow: hidden; }}
-        .progress-fill {{ height: 100%; background-color: #4CAF50; transition: width 0.3s ease; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>批量视频背景移除处理报告</h1>
-        
-        <div class="summary">
-            <h3>处理概要</h3>
-            <p><strong>处理时间:</strong> {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p><strong>使用模型:</strong> {self.model_name}</p>
-            <p><strong>最大帧数限制:</strong> {self.max_frames or '无限制'}</p>
-            <p><strong>总处理时间:</strong> {stats['total_time']:.2f} 秒</p>
-        </div>
-        
-        <div class="stats">
-            <div class="stat-item">
-                <div class="stat-number">{stats['total']}</div>
-                <div class="stat-label">总文件数</div>
-            </div>
-            <div class="stat-item">
-                <div class="stat-number success">{stats['success']}</div>
-                <div class="stat-label">成功处理</div>
-            </div>
-            <div class="stat-item">
-                <div class="stat-number failed">{stats['failed']}</div>
-                <div class="stat-label">处理失败</div>
-            </div>
-        </div>
-        
-        <div class="progress-bar">
-            <div class="progress-fill" style="width: {(stats['success']/stats['total']*100) if stats['total'] > 0 else 0:.1f}%"></div>
-        </div>
-        <p style="text-align: center; margin-top: 10px;">成功率: {(stats['success']/stats['total']*100) if stats['total'] > 0 else 0:.1f}%</p>
-        
-        <h3>详细结果</h3>
-        <table>
-            <thead>
-                <tr>
-                    <th>视频名称</th>
-                    <th>状态</th>
-                    <th>处理时间</th>
-                    <th>帧数</th>
-                    <th>分辨率</th>
-                    <th>帧率</th>
-                    <th>备注</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-        
-        for result in stats['results']:
-            status_class = 'success' if result['status'] == 'success' else 'failed'
-            status_text = '成功' if result['status'] == 'success' else '失败'
-            
-            if result['status'] == 'success':
-                frame_count = result.get('frame_count', 'N/A')
-                resolution = f"{result.get('resolution', [0, 0])[0]}x{result.get('resolution', [0, 0])[1]}"
-                fps = f"{result.get('fps', 0):.2f}"
-                note = '处理完成'
-            else:
-                frame_count = 'N/A'
-                resolution = 'N/A'
-                fps = 'N/A'
-                note = result.get('error', '未知错误')[:50] + ('...' if len(result.get('error', '')) > 50 else '')
-            
-            html_content += f"""
-                <tr>
-                    <td>{result['video_name']}</td>
-                    <td class="{status_class}">{status_text}</td>
-                    <td>{result['processing_time']:.2f}s</td>
-                    <td>{frame_count}</td>
-                    <td>{resolution}</td>
-                    <td>{fps}</td>
-                    <td>{note}</td>
-                </tr>
-"""
-        
-        html_content += """
-            </tbody>
-        </table>
-    </div>
-</body>
-</html>
-"""
+        total = stats['total']
+        success = stats['success']
+        failed = stats['failed']
+        success_rate = (success / total * 100) if total else 0.0
         
         try:
             with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                f.write(_HTML_HEADER_TEMPLATE.substitute(
+                    timestamp=time.strftime('%Y-%m-%d %H:%M:%S'),
+                    model_name=self.model_name,
+                    max_frames=self.max_frames or '无限制',
+                    total_time=f"{stats['total_time']:.2f}",
+                    total=total,
+                    success=success,
+                    failed=failed,
+                    success_rate=f"{success_rate:.1f}"
+                ))
+                
+                # 逐行写入结果，避免字符串反复拼接
+                for result in stats['results']:
+                    status_class = 'success' if result['status'] == 'success' else 'failed'
+                    status_text = '成功' if result['status'] == 'success' else '失败'
+                    
+                    if result['status'] == 'success':
+                        frame_count = result.get('frame_count', 'N/A')
+                        resolution = f"{result.get('resolution', [0, 0])[0]}x{result.get('resolution', [0, 0])[1]}"
+                        fps = f"{result.get('fps', 0):.2f}"
+                        note = '处理完成'
+                    else:
+                        frame_count = 'N/A'
+                        resolution = 'N/A'
+                        fps = 'N/A'
+                        note = result.get('error', '未知错误')[:50] + ('...' if len(result.get('error', '')) > 50 else '')
+                    
+                    f.write(_HTML_ROW_TEMPLATE.substitute(
+                        name=result['video_name'],
+                        status_class=status_class,
+                        status_text=status_text,
+                        processing_time=f"{result['processing_time']:.2f}",
+                        frame_count=frame_count,
+                        resolution=resolution,
+                        fps=fps,
+                        note=note
+                    ))
+                
+                f.write(_HTML_FOOTER)
             logger.info(f"HTML报告已保存: {html_path}")
         except Exception as e:
             logger.error(f"保存HTML报告失败: {e}")
@@ -368,6 +593,18 @@ def main():
     parser.add_argument('--extensions', nargs='+', 
                        default=['.mp4', '.avi', '.mov', '.mkv', '.wmv'],
                        help='支持的视频文件扩展名')
+    parser.add_argument('--cache-interval', type=int, default=1,
+                       help='遮罩复用的关键帧间隔 (1表示每帧都运行模型)')
+    parser.add_argument('-b', '--batch-size', type=int, default=8, help='每次模型推理的帧数')
+    parser.add_argument('--int8', action='store_true', help='使用INT8量化模型加速CPU推理')
+    parser.add_argument('--device', default='cpu', choices=DEVICE_CHOICES,
+                       help='推理设备 (auto 自动选择可用的CUDA/CoreML/DirectML后端)')
+    parser.add_argument('--fp16', action='store_true',
+                       help='硬件加速推理时使用FP16模型 (需要安装onnxconverter-common)')
+    parser.add_argument('--save-intermediate', action='store_true',
+                       help='保存原始帧和处理后的帧图片（用于调试）')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                       help='并行处理的视频数 (0表示自动: CPU核心数的一半；CUDA下为共享模型的线程数)')
     parser.add_argument('--html-report', action='store_true', help='生成HTML格式报告')
     parser.add_argument('-v', '--verbose', action='store_true', help='详细输出')
     
@@ -385,7 +622,14 @@ def main():
         # 创建批处理器
         processor = BatchVideoProcessor(
             model_name=args.model,
-            max_frames=args.max_frames
+            max_frames=args.max_frames,
+            num_workers=args.workers,
+            cache_interval=args.cache_interval,
+            batch_size=args.batch_size,
+            quantize=args.int8,
+            save_intermediate=args.save_intermediate,
+            device=args.device,
+            fp16=args.fp16
         )
         
         # 执行批处理
@@ -7,8 +7,7 @@
 
 import os
 import sys
-from pathlib import Path
-from video_background_remover import VideoBackgroundRemover
+from video_background_remover import VideoBackgroundRemover, get_remover
 from batch_processor import BatchVideoProcessor
 
 def example_basic_usage():
@@ -44,8 +43,9 @@ def example_basic_usage():
         print(f"🎥 输出MP4: {result['output_mp4']}")
         if result['output_webm']:
             print(f"🎬 输出WebM: {result['output_webm']}")
-        print(f"📁 帧目录: {result['frames_dir']}")
-        print(f"🖼️  处理后帧目录: {result['processed_frames_dir']}")
+        if result['frames_dir']:
+            print(f"📁 帧目录: {result['frames_dir']}")
+            print(f"🖼️  处理后帧目录: {result['processed_frames_dir']}")
         
     except Exception as e:
         print(f"❌ 处理失败: {e}")
@@ -73,14 +73,15 @@ def example_different_models():
         print(f"\n🤖 测试模型: {model_name} ({description})")
         
         try:
-            remover = VideoBackgroundRemover(model_name=model_name)
+            remover = get_remover(model_name)
             output_dir = f"output_{model_name}"
             
             result = remover.process_video(
                 input_video=input_video,
                 output_dir=output_dir,
                 max_frames=20,  # 少量帧用于快速比较
-                create_webm=False
+                create_webm=False,
+                frame_cache_dir=".frame_cache"  # 各模型复用同一份解码帧
             )
             
             print(f"✅ {description} 处理完成")
@@ -131,10 +132,10 @@ def example_batch_processing():
         print("请创建 'batch_input' 目录并放入一些视频文件")
         return
     
-    # 查找视频文件
-    video_files = []
-    for ext in ['.mp4', '.avi', '.mov']:
-        video_files.extend(Path(input_dir).glob(f"*{ext}"))
+    # 查找视频文件（一次列目录，按扩展名集合匹配）
+    video_exts = {'.mp4', '.avi', '.mov'}
+    video_files = [name for name in os.listdir(input_dir)
+                   if os.path.splitext(name)[1].lower() in video_exts]
     
     if not video_files:
         print(f"⚠️  在 {input_dir} 中未找到视频文件")
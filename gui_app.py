@@ -8,11 +8,19 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
+import collections
 import os
 from pathlib import Path
 import sys
-from video_background_remover import VideoBackgroundRemover, setup_logger
 import logging
+from logging.handlers import QueueHandler, QueueListener
+
+# 日志刷新到界面的间隔（毫秒）
+LOG_DRAIN_INTERVAL_MS = 33
+
+# 可选模型列表（与rembg支持的模型一致），写在这里避免启动时导入rembg
+MODEL_NAMES = ['u2net', 'u2netp', 'u2net_human_seg', 'isnet-general-use', 'silueta']
 
 class VideoBackgroundRemoverGUI:
     """视频背景移除GUI应用"""
@@ -32,11 +40,15 @@ class VideoBackgroundRemoverGUI:
         self.output_dir_path = tk.StringVar()
         self.model_name = tk.StringVar(value='u2net')
         self.max_frames = tk.StringVar()
+        self.sample_frames = tk.BooleanVar(value=False)
         self.create_webm = tk.BooleanVar(value=True)
+        self.skip_static = tk.BooleanVar(value=False)
         
         # 处理器
         self.remover = None
         self.processing = False
+        # 协作式停止信号，由处理流水线在每批帧之间检查
+        self.stop_event = threading.Event()
         
         # 设置日志
         self.setup_logging()
@@ -49,25 +61,16 @@ class VideoBackgroundRemoverGUI:
     
     def setup_logging(self):
         """设置日志系统"""
-        self.logger = setup_logger()
-        
-        # 创建自定义日志处理器，将日志输出到GUI
-        class GUILogHandler(logging.Handler):
-            def __init__(self, text_widget):
-                super().__init__()
-                self.text_widget = text_widget
-            
-            def emit(self, record):
-                msg = self.format(record)
-                # 在主线程中更新GUI
-                self.text_widget.after(0, lambda: self.append_log(msg))
-            
-            def append_log(self, msg):
-                self.text_widget.insert(tk.END, msg + "\n")
-                self.text_widget.see(tk.END)
+        # 控制台彩色输出由 video_background_remover 在首次导入时配置，
+        # 这里只取根日志器，避免启动界面时就加载onnxruntime/rembg等重量级依赖
+        self.logger = logging.getLogger()
+        self.logger.setLevel(logging.INFO)
         
-        # 稍后会设置这个处理器
+        # 稍后会设置这些处理器：处理线程只把日志记录放入队列，
+        # 由监听线程交给GUI处理器批量写入文本框
         self.gui_handler = None
+        self.log_queue = queue.Queue(-1)
+        self.log_listener = None
     
     def create_widgets(self):
         """创建GUI组件"""
@@ -96,9 +99,7 @@ class VideoBackgroundRemoverGUI:
         
         # 模型选择
         ttk.Label(main_frame, text="AI模型:").grid(row=3, column=0, sticky=tk.W, pady=5)
-        model_combo = ttk.Combobox(main_frame, textvariable=self.model_name, values=[
-            'u2net', 'u2netp', 'u2net_human_seg', 'isnet-general-use', 'silueta'
-        ], state='readonly', width=20)
+        model_combo = ttk.Combobox(main_frame, textvariable=self.model_name, values=MODEL_NAMES, state='readonly', width=20)
         model_combo.grid(row=3, column=1, sticky=tk.W, pady=5, padx=(5, 5))
         
         # 模型说明
@@ -112,12 +113,14 @@ class VideoBackgroundRemoverGUI:
         frames_frame.grid(row=5, column=1, sticky=tk.W, pady=5, padx=(5, 5))
         ttk.Entry(frames_frame, textvariable=self.max_frames, width=10).pack(side=tk.LEFT)
         ttk.Label(frames_frame, text="(留空表示处理全部帧)", font=('Arial', 8), foreground='gray').pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Checkbutton(frames_frame, text="在整段视频中均匀抽帧", variable=self.sample_frames).pack(side=tk.LEFT, padx=(10, 0))
         
         # 输出格式选项
         ttk.Label(main_frame, text="输出格式:").grid(row=6, column=0, sticky=tk.W, pady=5)
         format_frame = ttk.Frame(main_frame)
         format_frame.grid(row=6, column=1, sticky=tk.W, pady=5, padx=(5, 5))
         ttk.Checkbutton(format_frame, text="创建WebM格式 (更好的透明度支持)", variable=self.create_webm).pack(side=tk.LEFT)
+        ttk.Checkbutton(format_frame, text="静态画面复用遮罩 (适合录屏)", variable=self.skip_static).pack(side=tk.LEFT, padx=(10, 0))
         
         # 处理按钮
         button_frame = ttk.Frame(main_frame)
@@ -148,7 +151,10 @@ class VideoBackgroundRemoverGUI:
         # 设置日志处理器
         self.gui_handler = self.GUILogHandler(self.log_text)
         self.gui_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        self.logger.addHandler(self.gui_handler)
+        self.log_listener = QueueListener(self.log_queue, self.gui_handler)
+        self.log_listener.start()
+        self.logger.addHandler(QueueHandler(self.log_queue))
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_logs)
         
         # 配置主框架的行权重
         main_frame.rowconfigure(10, weight=1)
@@ -157,22 +163,49 @@ class VideoBackgroundRemoverGUI:
         self.create_menu()
     
     class GUILogHandler(logging.Handler):
+        """将日志暂存到队列，由Tk主线程定时批量写入文本框"""
+        
+        MAX_RECORDS_PER_DRAIN = 200
+        MAX_LINES = 1000
+        KEEP_LINES = 900
+        
         def __init__(self, text_widget):
             super().__init__()
             self.text_widget = text_widget
+            self.line_count = 0
+            self._pending = collections.deque()
         
         def emit(self, record):
-            msg = self.format(record)
-            # 在主线程中更新GUI
-            self.text_widget.after(0, lambda: self.append_log(msg))
-        
-        def append_log(self, msg):
-            self.text_widget.insert(tk.END, msg + "\n")
+            # 在日志监听线程中调用：deque的append本身是线程安全的，不加锁也不触碰Tk
+            self._pending.append(self.format(record))
+        
+        def drain(self):
+            """在Tk主线程中调用：取出最多 MAX_RECORDS_PER_DRAIN 条日志，一次性插入文本框"""
+            pending = self._pending
+            count = min(len(pending), self.MAX_RECORDS_PER_DRAIN)
+            if not count:
+                return
+            lines = [pending.popleft() for _ in range(count)]
+            
+            self.text_widget.insert(tk.END, "\n".join(lines) + "\n")
             self.text_widget.see(tk.END)
-            # 限制日志行数
-            lines = self.text_widget.get("1.0", tk.END).count("\n")
-            if lines > 1000:
-                self.text_widget.delete("1.0", "100.0")
+            
+            # 限制日志行数，按计数判断，无需扫描整个文本框
+            self.line_count += sum(line.count("\n") + 1 for line in lines)
+            if self.line_count > self.MAX_LINES:
+                excess = self.line_count - self.KEEP_LINES
+                self.text_widget.delete("1.0", f"{excess + 1}.0")
+                self.line_count = self.KEEP_LINES
+        
+        def clear(self):
+            """清空文本框并重置行数"""
+            self.text_widget.delete("1.0", tk.END)
+            self.line_count = 0
+    
+    def _drain_logs(self):
+        """约30Hz定时把暂存的日志写入文本框，日志再多每秒也只更新约30次界面"""
+        self.gui_handler.drain()
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_logs)
     
     def create_menu(self):
         """创建菜单栏"""
@@ -209,7 +242,7 @@ class VideoBackgroundRemoverGUI:
     
     def clear_log(self):
         """清空日志"""
-        self.log_text.delete(1.0, tk.END)
+        self.gui_handler.clear()
     
     def show_help(self):
         """显示使用说明"""
@@ -236,8 +269,6 @@ class VideoBackgroundRemoverGUI:
 处理完成后，输出目录将包含：
 - output_transparent.mp4: 透明背景视频
 - output_transparent.webm: WebM格式透明视频
-- frames/: 原始视频帧
-- processed_frames/: 处理后的帧
 
 注意：首次使用时会自动下载AI模型，请保持网络连接。
         """
@@ -300,13 +331,14 @@ class VideoBackgroundRemoverGUI:
         
         # 启动处理线程
         self.processing = True
+        self.stop_event.clear()
         self.process_button.config(state='disabled')
         self.stop_button.config(state='normal')
         self.progress_bar.start()
         self.progress_var.set("正在处理...")
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.clear_log()
         
         # 在新线程中处理
         self.process_thread = threading.Thread(target=self.process_video_thread)
@@ -315,13 +347,16 @@ class VideoBackgroundRemoverGUI:
     
     def stop_processing(self):
         """停止处理"""
-        self.processing = False
+        self.stop_event.set()
+        self.stop_button.config(state='disabled')
         self.progress_var.set("正在停止...")
-        # 注意：实际的停止逻辑需要在处理线程中实现
     
     def process_video_thread(self):
         """视频处理线程"""
         try:
+            # 延迟导入：模型推理相关的依赖只在第一次处理时加载
+            from video_background_remover import get_remover
+            
             # 获取参数
             input_video = self.input_video_path.get()
             output_dir = self.output_dir_path.get()
@@ -330,16 +365,22 @@ class VideoBackgroundRemoverGUI:
             if self.max_frames.get():
                 max_frames = int(self.max_frames.get())
             create_webm = self.create_webm.get()
+            sample_frames = self.sample_frames.get()
+            skip_static = self.skip_static.get()
             
-            # 创建处理器
-            self.remover = VideoBackgroundRemover(model_name=model_name)
+            # 获取处理器（同一模型在多次处理之间复用，不重复加载ONNX会话）
+            self.remover = get_remover(model_name)
             
             # 处理视频
             result = self.remover.process_video(
                 input_video=input_video,
                 output_dir=output_dir,
                 max_frames=max_frames,
-                create_webm=create_webm
+                create_webm=create_webm,
+                sample_frames=sample_frames,
+                skip_static=skip_static,
+                cancel_event=self.stop_event,
+                progress_callback=self.report_progress
             )
             
             # 处理完成
@@ -348,16 +389,20 @@ class VideoBackgroundRemoverGUI:
         except Exception as e:
             self.root.after(0, lambda: self.processing_failed(str(e)))
     
+    def report_progress(self, done, total, fps):
+        """处理线程的进度回调（已节流），在主线程中更新进度文字"""
+        self.root.after(0, lambda: self.progress_var.set(f"正在处理... {done}/{total} 帧 ({fps:.1f} fps)"))
+    
     def processing_completed(self, result):
         """处理完成回调"""
         self.processing = False
         self.process_button.config(state='normal')
         self.stop_button.config(state='disabled')
         self.progress_bar.stop()
-        self.progress_var.set("处理完成！")
+        self.progress_var.set("处理已停止" if result['cancelled'] else "处理完成！")
         
         # 显示结果
-        message = f"""视频处理完成！
+        message = f"""{'视频处理已停止，以下为已处理部分' if result['cancelled'] else '视频处理完成！'}
 
 处理信息：
 - 处理帧数: {result['frame_count']}
@@ -371,7 +416,8 @@ class VideoBackgroundRemoverGUI:
         if result['output_webm']:
             message += f"- WebM: {result['output_webm']}\n"
         
-        message += f"\n帧文件目录：\n- 原始帧: {result['frames_dir']}\n- 处理后帧: {result['processed_frames_dir']}"
+        if result['frames_dir']:
+            message += f"\n帧文件目录：\n- 原始帧: {result['frames_dir']}\n- 处理后帧: {result['processed_frames_dir']}"
         
         messagebox.showinfo("处理完成", message)
         
@@ -408,6 +454,7 @@ def main():
     
     # 启动GUI
     root.mainloop()
+    app.log_listener.stop()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型输入预处理
+将BGR视频帧缩放到模型输入尺寸、归一化并转换为CHW布局
+缩放统一使用OpenCV的INTER_AREA（区域平均，缩小时不产生混叠）；
+安装numba时颜色转换与归一化使用JIT编译的融合内核，否则回退到OpenCV实现
+"""
+
+import cv2
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _normalize(small, out, mean, inv_std):
+        """BGR转RGB + HWC转CHW，一次遍历写入输出缓冲区，随后原地归一化"""
+        height, width = out.shape[1], out.shape[2]
+
+        for y in prange(height):
+            for x in range(width):
+                for c in range(3):
+                    out[c, y, x] = np.float32(small[y, x, 2 - c])
+
+        inv_max = np.float32(1.0) / max(out.max(), np.float32(1e-6))
+        for y in prange(height):
+            for c in range(3):
+                for x in range(width):
+                    out[c, y, x] = (out[c, y, x] * inv_max - mean[c]) * inv_std[c]
+
+def _normalize_cv2(small, out, mean, inv_std):
+    """OpenCV实现（未安装numba时使用）"""
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB).astype(np.float32)
+    rgb *= np.float32(1.0) / max(float(rgb.max()), 1e-6)
+    rgb -= mean
+    rgb *= inv_std
+    out[:] = rgb.transpose(2, 0, 1)
+
+def preprocess(frame, out, mean, inv_std):
+    """
+    将BGR帧预处理后写入模型输入缓冲区
+
+    先在uint8上缩小到模型输入尺寸，之后的颜色转换和归一化只处理小图
+
+    Args:
+        frame (np.ndarray): BGR帧 (H, W, 3) uint8
+        out (np.ndarray): 输出缓冲区 (3, h, w) float32，由调用方预先分配
+        mean (np.ndarray): RGB均值 (3,) float32
+        inv_std (np.ndarray): RGB标准差的倒数 (3,) float32
+    """
+    size = (out.shape[2], out.shape[1])
+    if (frame.shape[1], frame.shape[0]) != size:
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if NUMBA_AVAILABLE:
+        _normalize(np.ascontiguousarray(frame), out, mean, inv_std)
+    else:
+        _normalize_cv2(frame, out, mean, inv_std)
@@ -8,9 +8,54 @@
 import os
 import sys
 import subprocess
-import importlib
+import hashlib
 from pathlib import Path
 
+# 依赖检查通过后记录requirements.txt的哈希，内容不变时跳过逐个导入检查
+REQUIREMENTS_OK_FILE = Path.home() / '.cache' / 'vbr' / 'reqs.ok'
+
+def _requirements_digest(content):
+    """计算依赖列表与当前Python解释器的哈希（切换虚拟环境后需要重新检查）"""
+    return hashlib.blake2b(content + sys.executable.encode(), digest_size=8).hexdigest()
+
+# 在子进程中逐个导入模块，输出导入失败的模块名（每行一个）
+_IMPORT_PROBE = """
+import importlib, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        print(name)
+"""
+
+def _find_missing_modules(import_names):
+    """
+    在单独的子进程中检查模块能否导入
+    
+    onnxruntime、cv2 等大型模块只在子进程里加载，启动器进程本身不占用这部分内存
+    
+    Args:
+        import_names (list): 要检查的模块名
+        
+    Returns:
+        set: 导入失败的模块名
+    """
+    result = subprocess.run([sys.executable, '-c', _IMPORT_PROBE] + list(import_names),
+                            capture_output=True, text=True)
+    missing = set(result.stdout.split())
+    if result.returncode != 0:
+        # 探测进程本身异常退出（如导入时崩溃），无法判断的模块都视为缺失
+        missing.update(import_names)
+    return missing
+
+def _mark_requirements_ok(digest):
+    """记录依赖检查通过"""
+    try:
+        REQUIREMENTS_OK_FILE.parent.mkdir(parents=True, exist_ok=True)
+        REQUIREMENTS_OK_FILE.write_text(digest, encoding='utf-8')
+    except OSError:
+        pass
+
 def check_python_version():
     """检查Python版本"""
     if sys.version_info < (3, 8):
@@ -22,8 +67,13 @@ def check_python_version():
     print(f"✅ Python版本检查通过: {sys.version.split()[0]}")
     return True
 
-def check_and_install_requirements():
-    """检查并安装依赖包"""
+def check_and_install_requirements(use_cache=True):
+    """
+    检查并安装依赖包
+    
+    Args:
+        use_cache (bool): requirements.txt未变化且上次检查通过时跳过检查
+    """
     print("\n🔍 检查依赖包...")
     
     requirements_file = Path(__file__).parent / "requirements.txt"
@@ -32,13 +82,24 @@ def check_and_install_requirements():
         print("❌ 未找到requirements.txt文件")
         return False
     
+    content = requirements_file.read_bytes()
+    digest = _requirements_digest(content)
+    if use_cache:
+        try:
+            if REQUIREMENTS_OK_FILE.read_text(encoding='utf-8').strip() == digest:
+                print("✅ 所有依赖包已安装 (cached)")
+                return True
+        except OSError:
+            pass
+    
     # 读取依赖列表
-    with open(requirements_file, 'r', encoding='utf-8') as f:
-        requirements = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    requirements = [line.strip() for line in content.decode('utf-8').splitlines()
+                    if line.strip() and not line.startswith('#')]
     
     missing_packages = []
     
-    # 检查每个包
+    # 解析包名与导入名
+    packages = []
     for requirement in requirements:
         package_name = requirement.split('==')[0].split('>=')[0].split('<=')[0]
         
@@ -50,13 +111,16 @@ def check_and_install_requirements():
             import_name = 'PIL'
         elif package_name == 'colorlog':
             import_name = 'colorlog'
-        
-        try:
-            importlib.import_module(import_name)
-            print(f"✅ {package_name} 已安装")
-        except ImportError:
+        packages.append((requirement, package_name, import_name))
+    
+    # 所有包在一个子进程中检查
+    missing_modules = _find_missing_modules([import_name for _, _, import_name in packages])
+    for requirement, package_name, import_name in packages:
+        if import_name in missing_modules:
             print(f"❌ {package_name} 未安装")
             missing_packages.append(requirement)
+        else:
+            print(f"✅ {package_name} 已安装")
     
     # 安装缺失的包
     if missing_packages:
@@ -81,6 +145,7 @@ def check_and_install_requirements():
     else:
         print("✅ 所有依赖包已安装")
     
+    _mark_requirements_ok(digest)
     return True
 
 def check_ffmpeg():
@@ -220,8 +285,8 @@ def run_environment_check():
     # Python版本
     check_python_version()
     
-    # 依赖包
-    check_and_install_requirements()
+    # 依赖包（环境检查时总是重新检查）
+    check_and_install_requirements(use_cache=False)
     
     # FFmpeg
     check_ffmpeg()
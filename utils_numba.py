@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逐像素合成内核
+将帧与遮罩合成为带透明通道的BGRA图像，以及将BGRA图像合成到白色背景上
+安装numba时使用JIT编译的并行内核，否则回退到NumPy实现
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _apply_alpha(frame, mask, out):
+        """一次遍历写入颜色通道和透明通道"""
+        height, width = mask.shape
+        for y in prange(height):
+            for x in range(width):
+                out[y, x, 0] = frame[y, x, 0]
+                out[y, x, 1] = frame[y, x, 1]
+                out[y, x, 2] = frame[y, x, 2]
+                out[y, x, 3] = mask[y, x]
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _blend_white(rgba, out):
+        """一次遍历完成白底合成，整数运算与OpenCV实现结果一致"""
+        height, width = out.shape[0], out.shape[1]
+        for y in prange(height):
+            for x in range(width):
+                a = np.uint32(rgba[y, x, 3])
+                inv_a = np.uint32(255) - a
+                for c in range(3):
+                    v = np.uint32(rgba[y, x, c]) * a + np.uint32(127)
+                    out[y, x, c] = np.uint8(v // np.uint32(255) + inv_a)
+
+def _apply_alpha_numpy(frame, mask, out):
+    """NumPy实现（未安装numba时使用）"""
+    out[:, :, :3] = frame
+    out[:, :, 3] = mask
+
+def apply_alpha(frame, mask, out=None):
+    """
+    将遮罩作为透明通道与帧合成
+    
+    Args:
+        frame (np.ndarray): BGR帧 (H, W, 3) uint8
+        mask (np.ndarray): alpha遮罩 (H, W) uint8
+        out (np.ndarray): 输出缓冲区 (H, W, 4) uint8，为None时新分配
+        
+    Returns:
+        np.ndarray: BGRA图像 (H, W, 4) uint8
+    """
+    if out is None:
+        out = np.empty(frame.shape[:2] + (4,), dtype=np.uint8)
+    
+    if NUMBA_AVAILABLE:
+        _apply_alpha(frame, mask, out)
+    else:
+        _apply_alpha_numpy(frame, mask, out)
+    return out
+
+def blend_white(rgba, out=None):
+    """
+    将BGRA图像合成到白色背景上
+    
+    需要安装numba；调用方应先检查 NUMBA_AVAILABLE
+    
+    Args:
+        rgba (np.ndarray): BGRA图像 (H, W, 4) uint8
+        out (np.ndarray): 输出缓冲区 (H, W, 3) uint8，为None时新分配
+        
+    Returns:
+        np.ndarray: BGR图像 (H, W, 3) uint8
+    """
+    if out is None:
+        out = np.empty(rgba.shape[:2] + (3,), dtype=np.uint8)
+    _blend_white(rgba, out)
+    return out
@@ -8,15 +8,34 @@
 import os
 import cv2
 import numpy as np
-from PIL import Image
-import rembg
-from rembg import remove, new_session
+import onnxruntime as ort
 from tqdm import tqdm
 import argparse
 import logging
 import colorlog
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import weakref
+import collections
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-import shutil
+from preprocessing import preprocess
+from utils_numba import NUMBA_AVAILABLE, apply_alpha, blend_white
+
+try:
+    import ffmpegcv
+except ImportError:
+    ffmpegcv = None
 
 # 配置日志
 def setup_logger():
@@ -44,26 +63,774 @@ def setup_logger():
 
 logger = setup_logger()
 
+# OpenCV内部线程池大小：解码、编码线程里的cv2调用只需少量线程，避免与模型推理争抢CPU
+OPENCV_THREADS = 2
+cv2.setNumThreads(OPENCV_THREADS)
+
+# 为解码、编码线程和ffmpeg预留的CPU核数，其余留给ONNX Runtime推理
+RESERVED_CPUS = 4
+
+# 流水线各阶段之间的队列长度（限制内存中缓存的帧数）
+PIPELINE_QUEUE_SIZE = 32
+
+# 静态帧跳过：dHash汉明距离小于该值时认为画面未变化
+DHASH_SKIP_THRESHOLD = 4
+
+# process_frames 多进程处理时，每个任务包含的连续帧数
+FRAME_CHUNK_SIZE = 64
+
+# 进度回调的节流：每处理这么多帧或经过这么多秒才回调一次
+PROGRESS_REPORT_FRAMES = 50
+PROGRESS_REPORT_INTERVAL = 0.2
+# 估算处理速度时使用最近多少个批次
+PROGRESS_FPS_WINDOW = 30
+
+# 进度条最短刷新间隔（秒），高帧率时避免刷新进度条的开销出现在处理循环中
+PROGRESS_BAR_MININTERVAL = 0.5
+
+# 写入ffmpeg管道的最小缓冲区大小（实际至少容纳两帧BGRA）
+FFMPEG_PIPE_BUFSIZE = 1 << 20
+
+# VP9编码参数：quality 使用libvpx默认的高质量模式，fast 使用实时模式（速度快数倍）
+WEBM_PRESETS = {
+    'quality': [],
+    'fast': ['-row-mt', '1', '-tile-columns', '2', '-cpu-used', '5', '-deadline', 'realtime'],
+}
+
+# 保留透明通道的主输出编码：(滤镜, ffmpeg编码参数, 文件扩展名)
+# prores 为ProRes 4444（.mov，剪辑软件通用）；hevc 为带alpha层的H.265（需要ffmpeg 7.1+的libx265），
+# 4:2:0 采样要求宽高为偶数，用透明像素补齐
+ALPHA_CODECS = {
+    'prores': ('null', ['-c:v', 'prores_ks', '-profile:v', '4444', '-pix_fmt', 'yuva444p10le'], '.mov'),
+    'hevc': ('pad=ceil(iw/2)*2:ceil(ih/2)*2:color=black@0',
+             ['-c:v', 'libx265', '-x265-params', 'alpha=1:log-level=error', '-pix_fmt', 'yuva420p', '-tag:v', 'hvc1'], '.mp4'),
+}
+
+# 白底MP4的H.264硬件编码器，按顺序探测第一个可用的；都不可用时使用libx264
+H264_HW_ENCODERS = (
+    ('h264_nvenc', ['-preset', 'p4', '-rc', 'vbr', '-cq', '23', '-b:v', '0']),
+    ('h264_videotoolbox', ['-q:v', '65']),
+    ('h264_qsv', ['-preset', 'veryfast', '-global_quality', '23']),
+)
+H264_FALLBACK_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast']
+
+# yuv420p要求宽高为偶数，奇数尺寸用白色补齐
+EVEN_SIZE_FILTER = 'pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white'
+
+# 推理设备对应的ONNX Runtime执行后端，auto 按此顺序选择第一个可用的
+DEVICE_PROVIDERS = {
+    'cuda': ('CUDAExecutionProvider', {'device_id': 0}),
+    'coreml': ('CoreMLExecutionProvider', {}),
+    'dml': ('DmlExecutionProvider', {'device_id': 0}),
+}
+DEVICE_CHOICES = ['auto', 'cpu', *DEVICE_PROVIDERS]
+
+# 各模型的输入尺寸与归一化参数（与rembg会话的预处理一致）
+MODEL_INPUT_SPECS = {
+    'u2net': ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    'u2netp': ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    'u2net_human_seg': ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    'silueta': ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    'isnet-general-use': ((1024, 1024), (0.5, 0.5, 0.5), (1.0, 1.0, 1.0)),
+}
+
+def _queue_put(q, item, stop_event):
+    """向队列放入数据，流水线停止时返回False"""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _queue_get(q, stop_event):
+    """从队列取出数据，流水线停止时返回None"""
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+def _session_options():
+    """
+    创建ONNX Runtime会话选项
+    
+    设置了 OMP_NUM_THREADS 时按其限制推理线程数（批处理的多进程模式），
+    否则为流水线的解码、编码线程预留 RESERVED_CPUS 个核。
+    模型按顺序执行，算子间并行线程固定为1，避免额外的线程池与算子内线程争抢CPU。
+    
+    Returns:
+        ort.SessionOptions: 会话选项
+    """
+    sess_opts = ort.SessionOptions()
+    sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    sess_opts.inter_op_num_threads = 1
+    if 'OMP_NUM_THREADS' in os.environ:
+        sess_opts.intra_op_num_threads = int(os.environ['OMP_NUM_THREADS'])
+    else:
+        cpus = os.cpu_count() or 1
+        sess_opts.intra_op_num_threads = max(1, cpus // 2, cpus - RESERVED_CPUS)
+    return sess_opts
+
+def composite_on_white(img, out=None):
+    """
+    将BGRA图像合成到白色背景上
+    
+    Args:
+        img (np.ndarray): BGRA图像
+        out (np.ndarray): 输出缓冲区 (H, W, 3) uint8，为None时新分配
+        
+    Returns:
+        np.ndarray: BGR图像
+    """
+    if NUMBA_AVAILABLE:
+        return blend_white(img, out)
+    
+    # 拆成连续的单通道平面后交给OpenCV的向量化内核：
+    # round(bgr*a/255) + (255-a)，与整数公式 (bgr*a + 255*(255-a) + 127)//255 结果完全一致
+    b, g, r, a = cv2.split(img)
+    alpha = cv2.merge((a, a, a))
+    out = cv2.merge((b, g, r), dst=out)
+    cv2.multiply(out, alpha, dst=out, scale=1.0 / 255)
+    cv2.add(out, cv2.bitwise_not(alpha, dst=alpha), dst=out)
+    return out
+
+# INT8量化模型的缓存目录
+QUANTIZED_MODEL_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'u2net_int8')
+
+# FP16模型的缓存目录
+FP16_MODEL_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'u2net_fp16')
+
+# 量化后精度下降明显的模型，即使指定INT8也保持FP32推理
+FP32_ONLY_MODELS = frozenset({'isnet-general-use'})
+
+def _converted_model_path(cache_dir, model_name, src_path):
+    """以原始模型的大小和修改时间区分缓存，模型更新后重新转换"""
+    stat = os.stat(src_path)
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{model_name}-{digest}.onnx")
+
+def _write_cached_model(dst_path, write):
+    """
+    先写入唯一的临时文件，完成后原子替换为缓存文件
+    
+    多个进程同时转换同一个模型时各写各的临时文件，缓存中不会出现交错写入的损坏模型
+    
+    Args:
+        dst_path (str): 缓存文件路径
+        write (callable): write(path)，将转换后的模型写入给定路径
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _ensure_quantized_model(model_name, src_path):
+    """
+    获取INT8动态量化后的模型，首次使用时量化并缓存到磁盘
+    
+    Args:
+        model_name (str): 模型名称
+        src_path (str): 原始FP32模型路径
+        
+    Returns:
+        str: 量化模型路径
+    """
+    dst_path = _converted_model_path(QUANTIZED_MODEL_DIR, model_name, src_path)
+    
+    if not os.path.exists(dst_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        logger.info(f"首次使用，正在量化模型: {model_name}")
+        os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+        _write_cached_model(dst_path, lambda path: quantize_dynamic(
+            src_path, path, weight_type=QuantType.QInt8, op_types_to_quantize=['Conv', 'MatMul']))
+    
+    return dst_path
+
+def _ensure_fp16_model(model_name, src_path):
+    """
+    获取权重转换为FP16的模型，首次使用时转换并缓存到磁盘
+    
+    输入输出保持float32，调用方的缓冲区和后处理不需要改动
+    
+    Args:
+        model_name (str): 模型名称
+        src_path (str): 原始FP32模型路径
+        
+    Returns:
+        str: FP16模型路径
+    """
+    dst_path = _converted_model_path(FP16_MODEL_DIR, model_name, src_path)
+    
+    if not os.path.exists(dst_path):
+        import onnx
+        from onnxconverter_common import float16
+        
+        logger.info(f"首次使用，正在转换FP16模型: {model_name}")
+        os.makedirs(FP16_MODEL_DIR, exist_ok=True)
+        model = float16.convert_float_to_float16(onnx.load(src_path), keep_io_types=True)
+        _write_cached_model(dst_path, lambda path: onnx.save(model, path))
+    
+    return dst_path
+
+def resolve_device(device):
+    """
+    解析推理设备，auto 时选择当前onnxruntime可用的第一个硬件加速后端
+    
+    Args:
+        device (str): DEVICE_CHOICES 之一
+        
+    Returns:
+        str: 实际使用的设备名
+    """
+    if device != 'auto':
+        return device
+    available = ort.get_available_providers()
+    for name, (provider, _) in DEVICE_PROVIDERS.items():
+        if provider in available:
+            return name
+    return 'cpu'
+
+def device_available(device):
+    """
+    检查推理设备对应的ONNX Runtime后端是否可用（不加载模型）
+    
+    Args:
+        device (str): 已解析的设备名（cpu 或 DEVICE_PROVIDERS 中的设备）
+        
+    Returns:
+        bool: 后端是否可用
+    """
+    return device == 'cpu' or DEVICE_PROVIDERS[device][0] in ort.get_available_providers()
+
+def _download_model(model_name):
+    """
+    获取模型文件路径，首次使用时由rembg下载
+    
+    只调用rembg会话类的 download_models()，不创建rembg的默认推理会话
+    
+    Args:
+        model_name (str): 模型名称
+        
+    Returns:
+        str: ONNX模型路径
+    """
+    from rembg.sessions import sessions_class
+    
+    for session_class in sessions_class:
+        if session_class.name() == model_name:
+            return session_class.download_models()
+    raise ValueError(f"rembg不支持的模型: {model_name}")
+
+@functools.lru_cache(maxsize=None)
+def _ffmpeg_encoders():
+    """
+    ffmpeg支持的编码器名称（进程内缓存）
+    
+    Returns:
+        frozenset: 编码器名称，ffmpeg不可用时为空集合
+    """
+    try:
+        output = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return frozenset()
+    # 每行格式为 " V....D libx264   描述"
+    return frozenset(re.findall(r'^\s*[VAS][.A-Z]{5}\s+(\S+)', output, re.MULTILINE))
+
+@functools.lru_cache(maxsize=None)
+def _h264_encoder_args():
+    """
+    选择H.264编码器：ffmpeg编译了硬件编码器且试编码一帧成功时使用硬件编码，否则使用libx264
+    
+    结果在进程内缓存，只探测一次
+    
+    Returns:
+        tuple: ffmpeg编码参数（包含 -c:v），没有可用的H.264编码器（如不含libx264的LGPL版ffmpeg）时返回None
+    """
+    encoders = _ffmpeg_encoders()
+    for name, args in H264_HW_ENCODERS:
+        if name not in encoders:
+            continue
+        # 编码器编译进ffmpeg不代表有对应的硬件，试编码一帧确认
+        probe = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'color=c=white:s=256x256:r=30', '-frames:v', '1',
+            '-pix_fmt', 'yuv420p', '-c:v', name, *args, '-f', 'null', '-',
+        ]
+        try:
+            if subprocess.run(probe, capture_output=True, timeout=10).returncode == 0:
+                logger.info(f"使用硬件编码器: {name}")
+                return ('-c:v', name, *args)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    if 'libx264' in encoders:
+        return tuple(H264_FALLBACK_ARGS)
+    return None
+
+def _read_frame_files(frame_paths, max_workers=None):
+    """
+    用线程池并行解码帧图片（cv2.imread解码PNG时会释放GIL），按原顺序逐帧返回
+    
+    同时在途的读取最多为线程数的两倍，不会把所有帧一次性读入内存
+    
+    Args:
+        frame_paths (list): 帧文件路径列表
+        max_workers (int): 线程数，默认为CPU核数
+        
+    Yields:
+        tuple: (帧路径, 图像数组)，读取失败时图像为None
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque()
+        for frame_path in frame_paths:
+            pending.append((frame_path, executor.submit(cv2.imread, frame_path, cv2.IMREAD_UNCHANGED)))
+            if len(pending) >= max_workers * 2:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+def _pin_host_buffer(buffer):
+    """
+    将主机缓冲区注册为锁页内存（需要cupy），加快主机到显存的拷贝
+    
+    Args:
+        buffer (np.ndarray): 需要锁页的连续数组
+        
+    Returns:
+        bool: 是否注册成功
+    """
+    try:
+        import cupy
+    except ImportError:
+        return False
+    
+    try:
+        cupy.cuda.runtime.hostRegister(buffer.ctypes.data, buffer.nbytes, 0)
+    except Exception as e:
+        logger.debug(f"锁页内存注册失败: {e}")
+        return False
+    # 缓冲区释放前解除注册
+    weakref.finalize(buffer, cupy.cuda.runtime.hostUnregister, buffer.ctypes.data)
+    return True
+
+class TemporalMaskCache:
+    """
+    相邻帧遮罩缓存
+    
+    视频相邻帧的内容高度相似，每隔 interval 帧才完整运行一次模型，
+    中间帧直接复用关键帧的遮罩；画面变化超过阈值（如场景切换）时强制刷新。
+    设置 dhash_threshold 时，与关键帧dHash几乎相同的静态帧不受间隔限制，一直复用遮罩；
+    设置 motion_threshold 时，与关键帧缩略图平均绝对差低于该值的低运动帧同样一直复用遮罩。
+    """
+    
+    def __init__(self, interval=1, scene_threshold=8.0, dhash_threshold=0, motion_threshold=0.0):
+        """
+        Args:
+            interval (int): 关键帧间隔，1表示每帧都运行模型
+            scene_threshold (float): 场景变化阈值（缩略灰度图的平均绝对差，0-255）
+            dhash_threshold (int): 静态帧判定阈值（64位dHash的汉明距离），0表示不跳过静态帧
+            motion_threshold (float): 低运动帧判定阈值（缩略灰度图的平均绝对差，0-255），0表示不启用
+        """
+        self.interval = max(1, int(interval or 1))
+        self.scene_threshold = scene_threshold
+        self.dhash_threshold = dhash_threshold
+        self.motion_threshold = motion_threshold or 0.0
+        # 最近一个关键帧的遮罩，由调用方在推理后写入
+        self.mask = None
+        self._key_signature = None
+        self._key_hash = None
+        self._since_refresh = 0
+    
+    @staticmethod
+    def _signature(frame):
+        """计算帧的缩略灰度签名"""
+        small = cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    
+    @staticmethod
+    def _dhash(frame):
+        """计算帧的64位差值哈希（9x8灰度图中相邻像素的明暗关系）"""
+        small = cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return int.from_bytes(np.packbits(gray[:, 1:] > gray[:, :-1]).tobytes(), 'big')
+    
+    def is_keyframe(self, frame):
+        """
+        判断该帧是否需要运行模型（需按帧顺序调用）
+        
+        Args:
+            frame (np.ndarray): BGR帧
+            
+        Returns:
+            bool: True表示需要重新推理，False表示可复用上一关键帧的遮罩
+        """
+        if self.dhash_threshold:
+            # 与关键帧（而不是上一帧）比较，缓慢变化的画面不会一直沿用旧遮罩
+            frame_hash = self._dhash(frame)
+            if (self._key_hash is not None
+                    and bin(frame_hash ^ self._key_hash).count('1') < self.dhash_threshold):
+                return False
+        elif self.interval == 1 and not self.motion_threshold:
+            return True
+        
+        signature = None
+        if self.interval > 1 or self.motion_threshold:
+            signature = self._signature(frame)
+            if self._key_signature is not None:
+                diff = np.abs(signature - self._key_signature).mean()
+                # 同样与关键帧比较，缓慢移动的画面累积到阈值后会重新推理
+                if diff < self.motion_threshold:
+                    return False
+                if self._since_refresh < self.interval and diff <= self.scene_threshold:
+                    self._since_refresh += 1
+                    return False
+        
+        self._key_signature = signature
+        if self.dhash_threshold:
+            self._key_hash = frame_hash
+        self._since_refresh = 1
+        return True
+
+class ThroughputWindow:
+    """
+    最近若干批次的处理速度统计
+    
+    每批完成的时刻和累计帧数分两列存放在预分配的环形数组中，
+    记录时只写两个标量，不为每帧/每批创建Python对象。
+    """
+    
+    def __init__(self, size=PROGRESS_FPS_WINDOW):
+        self.times = np.zeros(size, dtype=np.float64)
+        self.counts = np.zeros(size, dtype=np.int64)
+        self._next = 0
+        self._filled = 0
+    
+    def add(self, timestamp, frame_count):
+        """记录一个批次完成的时刻与此时的累计帧数"""
+        self.times[self._next] = timestamp
+        self.counts[self._next] = frame_count
+        self._next = (self._next + 1) % len(self.times)
+        self._filled = min(self._filled + 1, len(self.times))
+    
+    def fps(self):
+        """
+        Returns:
+            float: 窗口内的平均处理速度（帧/秒），记录不足两条时为0
+        """
+        if self._filled < 2:
+            return 0.0
+        newest = self._next - 1
+        oldest = self._next if self._filled == len(self.times) else 0
+        elapsed = self.times[newest] - self.times[oldest]
+        if elapsed <= 0:
+            return 0.0
+        return float((self.counts[newest] - self.counts[oldest]) / elapsed)
+
+class FrameCache:
+    """
+    解码帧缓存
+    
+    同一视频多次处理（如比较不同模型）时，首次解码的帧以原始uint8数组写入磁盘，
+    之后通过内存映射直接读取，跳过视频解码。数据文件 {key}.bin 存放 (N, H, W, 3) 帧，
+    {key}.json 记录 fps、宽高和帧数。
+    """
+    
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): 缓存目录
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(video_path, max_frames=None, sample_frames=False):
+        """
+        根据视频内容生成缓存键：文件前1MB + 大小 + 修改时间 + 帧数限制与抽帧方式
+        
+        Args:
+            video_path (str): 视频文件路径
+            max_frames (int): 最大处理帧数
+            sample_frames (bool): 是否在整段视频中均匀抽帧
+            
+        Returns:
+            str: 缓存键
+        """
+        stat = os.stat(video_path)
+        digest = hashlib.sha1()
+        with open(video_path, 'rb') as f:
+            digest.update(f.read(1 << 20))
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}:{max_frames}:{sample_frames}".encode())
+        return digest.hexdigest()
+    
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.bin', base + '.json'
+    
+    def load(self, key):
+        """
+        读取缓存
+        
+        Returns:
+            tuple: (帧数组memmap, 视频信息dict)，未命中时返回None
+        """
+        bin_path, info_path = self._paths(key)
+        if not (os.path.exists(bin_path) and os.path.exists(info_path)):
+            return None
+        
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        shape = (info['frame_count'], info['height'], info['width'], 3)
+        if info['frame_count'] == 0 or os.path.getsize(bin_path) != int(np.prod(shape)):
+            return None
+        return np.memmap(bin_path, dtype=np.uint8, mode='r', shape=shape), info
+    
+    def open_writer(self, key):
+        """打开临时数据文件，解码时逐帧追加写入"""
+        return open(self._paths(key)[0] + '.tmp', 'wb')
+    
+    def commit(self, key, fh, info):
+        """写入完成后提交缓存：先替换数据文件，再写入信息文件"""
+        bin_path, info_path = self._paths(key)
+        fh.close()
+        os.replace(fh.name, bin_path)
+        with open(info_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+    
+    def discard(self, fh):
+        """放弃未完成的缓存"""
+        fh.close()
+        try:
+            os.remove(fh.name)
+        except OSError:
+            pass
+
 class VideoBackgroundRemover:
     """视频背景移除处理类"""
     
-    def __init__(self, model_name='u2net'):
+    def __init__(self, model_name='u2net', quantize=False, device='cpu', fp16=False):
         """
         初始化背景移除器
         
         Args:
             model_name (str): 使用的模型名称，可选: u2net, u2netp, u2net_human_seg, isnet-general-use, silueta
+            quantize (bool): 是否使用INT8动态量化模型（CPU推理更快）
+            device (str): 推理设备，auto、cpu、cuda、coreml（Apple芯片）或 dml（DirectML）
+            fp16 (bool): 硬件加速推理时使用FP16模型（吞吐量更高，CPU推理时忽略）
         """
+        # 批量推理自行完成预处理，只支持已知输入尺寸和归一化参数的模型；在下载、加载模型之前检查
+        if model_name not in MODEL_INPUT_SPECS:
+            raise ValueError(f"不支持的模型: {model_name}，可选: {', '.join(MODEL_INPUT_SPECS)}")
+        
         self.model_name = model_name
+        self.quantize = quantize
+        self.fp16 = fp16
+        self.device = resolve_device(device)
         logger.info(f"初始化背景移除模型: {model_name}")
         
-        # 创建rembg会话
+        # 只借用rembg下载模型，推理会话由这里按选定的后端直接创建一次（rembg导入较慢，只在真正创建模型时导入）
         try:
-            self.session = new_session(model_name)
+            model_path = _download_model(model_name)
+            sess_opts = _session_options()
+            providers = ['CPUExecutionProvider']
+            if self.device != 'cpu' and not device_available(self.device):
+                logger.warning(f"未检测到{DEVICE_PROVIDERS[self.device][0]}推理后端（需要安装对应版本的onnxruntime，"
+                               f"如onnxruntime-gpu、onnxruntime-directml），使用CPU推理")
+                self.device = 'cpu'
+            if self.device != 'cpu':
+                if quantize:
+                    logger.warning("INT8动态量化仅用于CPU推理，硬件加速时使用FP32模型")
+                if fp16:
+                    model_path = self._fp16_model_path(model_path)
+                if self.device == 'dml':
+                    # DirectML不支持内存复用模式（顺序执行已由 _session_options 设置）
+                    sess_opts.enable_mem_pattern = False
+                providers = [DEVICE_PROVIDERS[self.device], 'CPUExecutionProvider']
+            elif quantize and model_name in FP32_ONLY_MODELS:
+                logger.warning(f"{model_name} 量化后精度下降明显，继续使用FP32模型")
+            elif quantize:
+                model_path = self._quantized_model_path(model_path)
+            elif fp16:
+                logger.warning("FP16模型仅用于硬件加速推理，CPU推理时使用FP32模型")
+            
+            self.session = ort.InferenceSession(model_path, sess_options=sess_opts, providers=providers)
+            if self.device != 'cpu':
+                logger.info(f"使用{DEVICE_PROVIDERS[self.device][0]}推理")
             logger.info("模型加载成功")
         except Exception as e:
             logger.error(f"模型加载失败: {e}")
             raise
+        
+        # 模型输入的批次维度固定时只能逐帧推理
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        model_output = self.session.get_outputs()[0]
+        self._output_name = model_output.name
+        # 输出除批次外的维度都固定时，可以预先在显存中分配输出
+        self._output_dims = tuple(model_output.shape[1:])
+        if not all(isinstance(d, int) for d in self._output_dims):
+            self._output_dims = None
+        self._fixed_batch = isinstance(model_input.shape[0], int)
+        # CUDA推理的IOBinding槽位，每个线程各自持有一组（两个交替使用），按输入缓冲区大小分配
+        self._cuda_local = threading.local()
+        
+        _, mean, std = MODEL_INPUT_SPECS[model_name]
+        self._mean = np.array(mean, dtype=np.float32)
+        self._inv_std = np.float32(1.0) / np.array(std, dtype=np.float32)
+        
+        self._warm_up()
+    
+    def _warm_up(self):
+        """
+        用一帧空白图像运行一次完整推理
+        
+        首次推理会触发内核初始化、内存分配（以及numba内核加载），提前执行一次，
+        避免处理第一批帧时出现数百毫秒的延迟
+        """
+        (width, height), _, _ = MODEL_INPUT_SPECS[self.model_name]
+        start = time.perf_counter()
+        self.predict_masks([np.zeros((height, width, 3), dtype=np.uint8)])
+        logger.debug(f"模型预热完成，用时 {time.perf_counter() - start:.2f}s")
+    
+    def _quantized_model_path(self, src_path):
+        """获取INT8量化模型路径，量化不可用时返回原始FP32模型"""
+        try:
+            model_path = _ensure_quantized_model(self.model_name, src_path)
+        except ImportError as e:
+            logger.warning(f"无法量化模型（需要安装onnx），继续使用FP32模型: {e}")
+            return src_path
+        
+        logger.info(f"使用INT8量化模型: {model_path}")
+        return model_path
+    
+    def _fp16_model_path(self, src_path):
+        """获取FP16模型路径，转换不可用时返回原始FP32模型"""
+        try:
+            model_path = _ensure_fp16_model(self.model_name, src_path)
+        except ImportError as e:
+            logger.warning(f"无法转换FP16模型（需要安装onnx和onnxconverter-common），继续使用FP32模型: {e}")
+            return src_path
+        
+        logger.info(f"使用FP16模型: {model_path}")
+        return model_path
+    
+    def new_input_buffer(self, batch_size):
+        """
+        分配模型输入缓冲区，批量推理时重复使用
+        
+        Args:
+            batch_size (int): 批大小
+            
+        Returns:
+            np.ndarray: (batch_size, 3, H, W) float32 缓冲区
+        """
+        (width, height), _, _ = MODEL_INPUT_SPECS[self.model_name]
+        buffer = np.empty((batch_size, 3, height, width), dtype=np.float32)
+        if self.device == 'cuda':
+            _pin_host_buffer(buffer)
+        return buffer
+    
+    def _run_cuda(self, batch):
+        """
+        通过IOBinding在显存中推理
+        
+        每个线程只保留一组按输入形状分配的显存槽位（两个交替使用），上传当前批次时不会覆盖
+        上一批次仍绑定着的显存；输入形状变化时释放旧槽位重新分配。输出形状已知时也预先分配
+        在显存中，整批只绑定一次、每次推理只拷回这一个输出。多个线程可共享同一个会话并行推理。
+        
+        Args:
+            batch (np.ndarray): (N, 3, H, W) float32 模型输入
+            
+        Returns:
+            np.ndarray: 模型输出
+        """
+        local = self._cuda_local
+        if getattr(local, 'shape', None) != batch.shape:
+            slots = []
+            for _ in range(2):
+                device_input = ort.OrtValue.ortvalue_from_shape_and_type(batch.shape, np.float32, 'cuda', 0)
+                binding = self.session.io_binding()
+                binding.bind_ortvalue_input(self._input_name, device_input)
+                if self._output_dims is not None:
+                    device_output = ort.OrtValue.ortvalue_from_shape_and_type(
+                        (batch.shape[0],) + self._output_dims, np.float32, 'cuda', 0)
+                    binding.bind_ortvalue_output(self._output_name, device_output)
+                else:
+                    device_output = None
+                    binding.bind_output(self._output_name, 'cuda', 0)
+                slots.append((binding, device_input, device_output))
+            local.slots = slots
+            local.shape = batch.shape
+            local.turn = 0
+        
+        binding, device_input, device_output = local.slots[local.turn]
+        local.turn ^= 1
+        device_input.update_inplace(batch)
+        self.session.run_with_iobinding(binding)
+        if device_output is not None:
+            return device_output.numpy()
+        return binding.copy_outputs_to_cpu()[0]
+    
+    @staticmethod
+    def _postprocess(pred, width, height):
+        """将模型输出归一化为uint8遮罩并缩放回原帧尺寸"""
+        mi = pred.min()
+        ma = pred.max()
+        pred = (pred - mi) / max(ma - mi, 1e-6)
+        mask = (pred.clip(0, 1) * 255).astype(np.uint8)
+        # 遮罩本身是平滑的，双线性放大即可，比LANCZOS快得多
+        return cv2.resize(mask, (width, height), interpolation=cv2.INTER_LINEAR)
+    
+    def predict_masks(self, frames, input_buffer=None):
+        """
+        批量运行模型，得到每帧的前景遮罩
+        
+        Args:
+            frames (list): BGR帧列表
+            input_buffer (np.ndarray): 预先分配的输入缓冲区，为None时按需分配
+            
+        Returns:
+            list: 与原帧同尺寸的alpha遮罩列表 (uint8)
+        """
+        if not frames:
+            return []
+        
+        if input_buffer is None:
+            input_buffer = self.new_input_buffer(1 if self._fixed_batch else len(frames))
+        batch_size = 1 if self._fixed_batch else len(input_buffer)
+        
+        masks = []
+        for start in range(0, len(frames), batch_size):
+            chunk = frames[start:start + batch_size]
+            batch = input_buffer[:len(chunk)]
+            for i, frame in enumerate(chunk):
+                preprocess(frame, batch[i], self._mean, self._inv_std)
+            
+            if self.device == 'cuda':
+                # 末尾批次、只推理关键帧时的短批次也按整个缓冲区推理（多余的行结果丢弃），
+                # 显存槽位只按缓冲区大小分配一次
+                preds = self._run_cuda(input_buffer[:batch_size])[:len(chunk)]
+            else:
+                preds = self.session.run(None, {self._input_name: batch})[0]
+            for i, frame in enumerate(chunk):
+                masks.append(self._postprocess(preds[i, 0], frame.shape[1], frame.shape[0]))
+        
+        return masks
     
     def extract_frames(self, video_path, output_dir, max_frames=None):
         """
@@ -104,10 +871,14 @@ class VideoBackgroundRemover:
         frame_count = 0
         extracted_frames = []
         
-        with tqdm(total=total_frames, desc="提取帧") as pbar:
+        # 帧写入文件后即可丢弃，每次retrieve都解码到同一个数组中
+        frame = None
+        with tqdm(total=total_frames, desc="提取帧", mininterval=PROGRESS_BAR_MININTERVAL) as pbar:
             while True:
-                ret, frame = cap.read()
-                if not ret or (max_frames and frame_count >= max_frames):
+                if (max_frames and frame_count >= max_frames) or not cap.grab():
+                    break
+                ret, frame = cap.retrieve(frame)
+                if not ret:
                     break
                 
                 # 保存帧
@@ -133,28 +904,92 @@ class VideoBackgroundRemover:
             output_path (str): 输出路径
         """
         try:
-            # 读取图像
-            with open(frame_path, 'rb') as f:
-                input_data = f.read()
+            # 读取图像，直接以数组推理，不经过rembg的字节编解码
+            frame = cv2.imread(frame_path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"无法读取图像: {frame_path}")
             
-            # 移除背景
-            output_data = remove(input_data, session=self.session)
-            
-            # 保存结果
-            with open(output_path, 'wb') as f:
-                f.write(output_data)
+            # 移除背景并保存为带透明通道的PNG
+            if not cv2.imwrite(output_path, apply_alpha(frame, self.predict_mask(frame))):
+                raise ValueError(f"无法写入图像: {output_path}")
                 
         except Exception as e:
             logger.error(f"处理帧失败 {frame_path}: {e}")
             raise
     
-    def process_frames(self, frames_list, output_dir):
+    def predict_mask(self, frame):
+        """
+        对单帧运行模型，得到前景遮罩
+        
+        Args:
+            frame (np.ndarray): BGR帧
+            
+        Returns:
+            np.ndarray: 与原帧同尺寸的alpha遮罩 (uint8)
+        """
+        return self.predict_masks([frame])[0]
+    
+    def _process_frame_chunk(self, frames_list, start, processed_dir, mask_cache, batch_size,
+                             input_buffer, pbar=None):
+        """
+        按批读取一段连续的帧文件，移除背景后写入PNG
+        
+        Args:
+            frames_list (list): 这一段的帧文件路径
+            start (int): 这一段第一帧的序号（用于输出文件名）
+            processed_dir (str): 输出目录
+            mask_cache (TemporalMaskCache): 遮罩缓存，按帧顺序使用
+            batch_size (int): 每次模型推理的帧数
+            input_buffer (np.ndarray): 模型输入缓冲区
+            pbar (tqdm): 进度条，为None时不更新
+            
+        Returns:
+            tuple: (处理后的帧路径列表, 模型推理次数)
+        """
+        processed_frames = []
+        inferred = 0
+        for offset in range(0, len(frames_list), batch_size):
+            frames = []
+            for frame_path in frames_list[offset:offset + batch_size]:
+                frame = cv2.imread(frame_path, cv2.IMREAD_COLOR)
+                if frame is None:
+                    raise ValueError(f"无法读取帧: {frame_path}")
+                frames.append(frame)
+            
+            # 一批关键帧一次推理（非关键帧复用关键帧遮罩）
+            keyframes = [mask_cache.is_keyframe(frame) for frame in frames]
+            masks = iter(self.predict_masks(
+                [frame for frame, is_key in zip(frames, keyframes) if is_key],
+                input_buffer
+            ))
+            inferred += sum(keyframes)
+            
+            for i, (frame, is_key) in enumerate(zip(frames, keyframes), start + offset):
+                if is_key:
+                    mask_cache.mask = next(masks)
+                output_path = os.path.join(processed_dir, f"processed_frame_{i:06d}.png")
+                cv2.imwrite(output_path, apply_alpha(frame, mask_cache.mask))
+                processed_frames.append(output_path)
+            
+            if pbar is not None:
+                pbar.update(len(frames))
+        
+        return processed_frames, inferred
+    
+    def process_frames(self, frames_list, output_dir, cache_interval=1, skip_static=False,
+                       batch_size=8, n_jobs=1, motion_threshold=0.0):
         """
         批量处理帧，移除背景
         
         Args:
             frames_list (list): 帧文件路径列表
             output_dir (str): 输出目录
+            cache_interval (int): 遮罩复用的关键帧间隔，1表示每帧都运行模型
+            skip_static (bool): 画面与关键帧几乎相同（dHash）时复用遮罩，跳过模型推理
+            batch_size (int): 每次模型推理的帧数
+            n_jobs (int): 并行进程数，大于1时每个进程加载一份模型，
+                各自处理连续的 FRAME_CHUNK_SIZE 帧（遮罩复用不跨段）
+            motion_threshold (float): 与关键帧的缩略图平均绝对差低于该值时复用遮罩，0表示不启用
             
         Returns:
             list: 处理后的帧路径列表
@@ -165,25 +1000,48 @@ class VideoBackgroundRemover:
         processed_dir = os.path.join(output_dir, 'processed_frames')
         os.makedirs(processed_dir, exist_ok=True)
         
-        processed_frames = []
+        batch_size = max(1, batch_size)
+        dhash_threshold = DHASH_SKIP_THRESHOLD if skip_static else 0
+        # 每个进程都持有一份模型，进程数不超过CPU核数
+        n_jobs = max(1, min(n_jobs or 1, os.cpu_count() or 1,
+                            -(-len(frames_list) // FRAME_CHUNK_SIZE)))
         
-        with tqdm(total=len(frames_list), desc="移除背景") as pbar:
-            for i, frame_path in enumerate(frames_list):
-                # 生成输出路径
-                frame_filename = f"processed_frame_{i:06d}.png"
-                output_path = os.path.join(processed_dir, frame_filename)
-                
-                # 处理帧
-                self.remove_background_from_frame(frame_path, output_path)
-                processed_frames.append(output_path)
-                
-                pbar.update(1)
+        with tqdm(total=len(frames_list), desc="移除背景", mininterval=PROGRESS_BAR_MININTERVAL) as pbar:
+            if n_jobs == 1:
+                processed_frames, inferred = self._process_frame_chunk(
+                    frames_list, 0, processed_dir,
+                    TemporalMaskCache(cache_interval, dhash_threshold=dhash_threshold,
+                                      motion_threshold=motion_threshold),
+                    batch_size, self.new_input_buffer(batch_size), pbar
+                )
+            else:
+                logger.info(f"使用 {n_jobs} 个进程并行处理")
+                processed_frames = []
+                inferred = 0
+                starts = range(0, len(frames_list), FRAME_CHUNK_SIZE)
+                # 当前进程已启动numba/ONNX Runtime的线程池（TBB等不支持fork），工作进程用spawn方式创建
+                with ProcessPoolExecutor(max_workers=n_jobs,
+                                         mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_frame_worker,
+                                         initargs=(self.model_name, self.quantize, n_jobs)) as executor:
+                    results = executor.map(
+                        _process_frame_chunk_worker,
+                        [frames_list[i:i + FRAME_CHUNK_SIZE] for i in starts], starts,
+                        [processed_dir] * len(starts), [cache_interval] * len(starts),
+                        [dhash_threshold] * len(starts), [batch_size] * len(starts),
+                        [motion_threshold] * len(starts)
+                    )
+                    for paths, chunk_inferred in results:
+                        processed_frames.extend(paths)
+                        inferred += chunk_inferred
+                        pbar.update(len(paths))
         
-        logger.info(f"成功处理 {len(processed_frames)} 帧")
+        logger.info(f"成功处理 {len(processed_frames)} 帧 (模型推理 {inferred} 次)")
 
         return processed_frames
     
-    def create_transparent_video(self, processed_frames, output_path, fps, width, height):
+    def create_transparent_video(self, processed_frames, output_path, fps, width, height,
+                                 alpha_codec=None):
         """
         从处理后的帧创建透明背景视频
         
@@ -193,45 +1051,87 @@ class VideoBackgroundRemover:
             fps (float): 帧率
             width (int): 视频宽度
             height (int): 视频高度
+            alpha_codec (str): 保留透明通道的编码（见 ALPHA_CODECS），为None时合成到白色背景
         """
         logger.info(f"开始创建透明背景视频: {output_path}")
+        if not processed_frames:
+            raise ValueError("没有可编码的帧")
         
-        # 使用支持透明度的编码器
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height), True)
+        if alpha_codec is not None:
+            video_filter, codec_args, _ = ALPHA_CODECS[alpha_codec]
+            self._encode_frame_files(processed_frames, output_path, fps, ['-vf', video_filter, *codec_args])
+            logger.info("视频创建完成")
+            return
         
-        if not out.isOpened():
-            logger.error("无法创建视频写入器")
-            raise ValueError("无法创建视频文件")
+        # 处理后的帧与原视频同尺寸，只检查第一帧，不逐帧比较和缩放
+        frames = _read_frame_files(processed_frames)
+        first = next(frames)
+        frames = itertools.chain([first], frames)
+        if first[1] is not None and first[1].shape[:2] != (height, width):
+            raise ValueError(f"帧尺寸 {first[1].shape[1]}x{first[1].shape[0]} 与视频尺寸 {width}x{height} 不一致")
         
-        with tqdm(total=len(processed_frames), desc="生成视频") as pbar:
-            for frame_path in processed_frames:
-                # 读取带透明度的图像
-                img = cv2.imread(frame_path, cv2.IMREAD_UNCHANGED)
-                
-                if img is None:
-                    logger.warning(f"无法读取帧: {frame_path}")
-                    continue
-                
-                # 如果图像有4个通道(RGBA)，需要处理透明度
-                if img.shape[2] == 4:
-                    # 将RGBA转换为RGB，使用白色背景
-                    alpha = img[:, :, 3] / 255.0
-                    for c in range(3):
-                        img[:, :, c] = img[:, :, c] * alpha + 255 * (1 - alpha)
-                    img = img[:, :, :3]
-                
-                # 确保图像尺寸正确
-                if img.shape[:2] != (height, width):
-                    img = cv2.resize(img, (width, height))
-                
-                out.write(img.astype(np.uint8))
-                pbar.update(1)
+        # 白底画面以BGR原始数据写入ffmpeg编码为H.264，ffmpeg或H.264编码器不可用时退回OpenCV的mp4v编码
+        proc = None
+        out = None
+        codec_args = _h264_encoder_args()
+        if codec_args is not None:
+            cmd = [
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+                '-vf', EVEN_SIZE_FILTER, '-pix_fmt', 'yuv420p', *codec_args, output_path,
+            ]
+            try:
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        bufsize=max(FFMPEG_PIPE_BUFSIZE, width * height * 3 * 2))
+            except OSError as e:
+                logger.warning(f"无法启动ffmpeg，使用mp4v编码: {e}")
+        else:
+            logger.warning("ffmpeg没有可用的H.264编码器，使用mp4v编码")
         
-        out.release()
+        if proc is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height), True)
+            if not out.isOpened():
+                logger.error("无法创建视频写入器")
+                raise ValueError("无法创建视频文件")
+        
+        try:
+            with tqdm(total=len(processed_frames), desc="生成视频",
+                      mininterval=PROGRESS_BAR_MININTERVAL) as pbar:
+                # 多线程预读带透明度的图像；白底合成的结果写入同一个输出数组
+                out_bgr = None
+                for frame_path, img in frames:
+                    if img is None:
+                        logger.warning(f"无法读取帧: {frame_path}")
+                        continue
+                    
+                    # 如果图像有4个通道(RGBA)，需要处理透明度
+                    if img.shape[2] == 4:
+                        # 将RGBA转换为RGB，使用白色背景
+                        img = out_bgr = composite_on_white(img, out_bgr)
+                    
+                    if proc is not None:
+                        proc.stdin.write(img.data)
+                    else:
+                        out.write(img)
+                    pbar.update(1)
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"ffmpeg编码失败: {e}") from e
+        finally:
+            if proc is not None:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+                proc.wait()
+            else:
+                out.release()
+        
+        if proc is not None and proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg编码失败，返回码 {proc.returncode}")
         logger.info("视频创建完成")
     
-    def create_webm_with_transparency(self, processed_frames, output_path, fps):
+    def create_webm_with_transparency(self, processed_frames, output_path, fps, webm_preset='quality'):
         """
         创建支持透明度的WebM视频
         
@@ -239,18 +1139,474 @@ class VideoBackgroundRemover:
             processed_frames (list): 处理后的帧路径列表
             output_path (str): 输出视频路径
             fps (float): 帧率
+            webm_preset (str): VP9编码预设，quality（高质量）或 fast（实时编码）
         """
         logger.info(f"开始创建透明WebM视频: {output_path}")
+        self._encode_frame_files(processed_frames, output_path, fps,
+                                 ['-c:v', 'libvpx-vp9', *WEBM_PRESETS[webm_preset], '-pix_fmt', 'yuva420p'])
+        logger.info(f"WebM视频创建完成: {output_path}")
+    
+    def _encode_frame_files(self, processed_frames, output_path, fps, output_args):
+        """
+        按列表顺序读取帧，以BGRA原始数据写入ffmpeg的标准输入进行编码，
+        不依赖帧文件的命名规则，也不经过shell拼接路径
         
-        # 使用ffmpeg命令创建透明WebM
-        frames_pattern = os.path.join(os.path.dirname(processed_frames[0]), 'processed_frame_%06d.png')
+        Args:
+            processed_frames (list): 处理后的帧路径列表
+            output_path (str): 输出视频路径
+            fps (float): 帧率
+            output_args (list): ffmpeg输出编码参数
+        """
+        if not processed_frames:
+            raise ValueError("没有可编码的帧")
+        frames = _read_frame_files(processed_frames)
+        first = next(frames)[1]
+        if first is None:
+            raise ValueError(f"无法读取帧: {processed_frames[0]}")
+        height, width = first.shape[:2]
         
-        cmd = f"ffmpeg -y -framerate {fps} -i '{frames_pattern}' -c:v libvpx-vp9 -pix_fmt yuva420p '{output_path}'"
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgra', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            *output_args, output_path,
+        ]
+        logger.info(f"执行命令: {' '.join(cmd)}")
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    bufsize=max(FFMPEG_PIPE_BUFSIZE, width * height * 4 * 2))
+        except OSError as e:
+            raise RuntimeError(f"无法启动ffmpeg（请确认已安装ffmpeg）: {e}") from e
+        try:
+            for frame_path, img in itertools.chain([(processed_frames[0], first)], frames):
+                if img is None:
+                    raise ValueError(f"无法读取帧: {frame_path}")
+                if img.shape[2] == 3:
+                    img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+                proc.stdin.write(img.data)
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"ffmpeg编码失败: {e}") from e
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            proc.wait()
         
-        logger.info(f"执行命令: {cmd}")
-        os.system(cmd)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg编码失败，返回码 {proc.returncode}")
     
-    def process_video(self, input_video, output_dir, max_frames=None, create_webm=True):
+    def _open_ffmpeg_writer(self, output_mp4, output_webm, fps, width, height, webm_preset='quality',
+                            alpha_codec=None):
+        """
+        启动一个ffmpeg进程，从标准输入接收BGRA原始帧，同时编码主输出与WebM：
+        主输出默认为白底合成的H.264 MP4（有可用的硬件编码器时使用硬件编码），
+        指定 alpha_codec 时改为保留透明通道的编码；
+        WebM为带透明通道的VP9。每帧只需写入一次
+        
+        Args:
+            output_mp4 (str): 主输出路径，为None时只生成WebM；白底输出需要 _h264_encoder_args() 可用
+            output_webm (str): 输出WebM路径，为None时不生成WebM
+            fps (float): 帧率
+            width (int): 视频宽度
+            height (int): 视频高度
+            webm_preset (str): VP9编码预设，quality 或 fast
+            alpha_codec (str): 主输出的透明通道编码（见 ALPHA_CODECS），为None时合成到白色背景
+            
+        Returns:
+            subprocess.Popen: ffmpeg进程，ffmpeg不可用时返回None
+        """
+        size = f'{width}x{height}'
+        # 输入帧按需分成主输出(fg)和WebM两路
+        if output_mp4 and output_webm:
+            filter_graph = '[0:v]split=2[fg][webm]'
+        elif output_mp4:
+            filter_graph = '[0:v]null[fg]'
+        else:
+            filter_graph = '[0:v]null[webm]'
+        
+        outputs = []
+        if output_mp4:
+            if alpha_codec is None:
+                # 前景与白色背景叠加得到MP4画面
+                filter_graph += (
+                    f';color=c=white:s={size}:r={fps}[bg];'
+                    f'[bg][fg]overlay=shortest=1:format=rgb,{EVEN_SIZE_FILTER},format=yuv420p[mp4]'
+                )
+                codec_args = _h264_encoder_args()
+            else:
+                video_filter, codec_args, _ = ALPHA_CODECS[alpha_codec]
+                filter_graph += f';[fg]{video_filter}[mp4]'
+            outputs += ['-map', '[mp4]', *codec_args, output_mp4]
+        if output_webm:
+            outputs += ['-map', '[webm]', '-c:v', 'libvpx-vp9', *WEBM_PRESETS[webm_preset],
+                        '-pix_fmt', 'yuva420p', output_webm]
+        
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgra', '-s', size, '-r', str(fps), '-i', '-',
+            '-filter_complex', filter_graph, *outputs,
+        ]
+        logger.debug(f"执行命令: {' '.join(cmd)}")
+        try:
+            return subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    bufsize=max(FFMPEG_PIPE_BUFSIZE, width * height * 4 * 2))
+        except OSError as e:
+            logger.warning(f"无法启动ffmpeg: {e}")
+            return None
+    
+    def _open_capture(self, input_video):
+        """
+        打开视频：CUDA推理且安装了ffmpegcv时使用NVDEC硬件解码，否则使用OpenCV
+        
+        Returns:
+            tuple: (视频读取器, fps, 总帧数, 视频宽度, 视频高度)
+        """
+        if self.device == 'cuda' and ffmpegcv is not None:
+            try:
+                cap = ffmpegcv.VideoCaptureNV(input_video)
+                logger.info("使用NVDEC硬件解码")
+                return cap, cap.fps, cap.count, cap.width, cap.height
+            except Exception as e:
+                logger.warning(f"NVDEC硬件解码不可用，使用OpenCV解码: {e}")
+        
+        cap = cv2.VideoCapture(input_video)
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频文件: {input_video}")
+        
+        return (cap, cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    
+    @staticmethod
+    def _iter_capture(cap, max_frames, keep_indices=None, frame_pool=None):
+        """
+        逐帧读取视频
+        
+        跳过的帧只调用 grab() 解复用，不做解码后的颜色转换和拷贝；
+        需要处理的帧才调用 retrieve() 取出图像
+        
+        Args:
+            cap (cv2.VideoCapture): 已打开的视频
+            max_frames (int): 最多读取的帧数
+            keep_indices (frozenset): 需要读取的帧序号，为None时读取全部帧
+            frame_pool (queue.SimpleQueue): 可复用的帧数组，retrieve() 优先解码到其中的数组
+        """
+        # ffmpegcv的读取器没有grab/retrieve，跳过的帧也需要完整读出
+        split_read = isinstance(cap, cv2.VideoCapture)
+        frame_count = 0
+        idx = 0
+        while not (max_frames and frame_count >= max_frames):
+            keep = keep_indices is None or idx in keep_indices
+            if split_read:
+                if not cap.grab():
+                    break
+                if keep:
+                    buffer = None
+                    if frame_pool is not None:
+                        try:
+                            buffer = frame_pool.get_nowait()
+                        except queue.Empty:
+                            pass
+                    ret, frame = cap.retrieve(buffer)
+                else:
+                    ret, frame = True, None
+            else:
+                ret, frame = cap.read()
+            if not ret:
+                break
+            
+            if keep:
+                yield frame
+                frame_count += 1
+            idx += 1
+    
+    def _read_frames(self, frames, decode_q, stop_event, frames_dir, cache_file=None):
+        """
+        解码阶段：读取视频帧并送入解码队列
+        
+        Args:
+            frames (iterable): 帧来源（视频解码或帧缓存）
+            cache_file (file): 帧缓存数据文件，不为None时同时写入解码后的帧
+            
+        Returns:
+            int: 读取的帧数，被中途停止时返回None
+        """
+        frame_count = 0
+        for frame in frames:
+            if frames_dir:
+                cv2.imwrite(os.path.join(frames_dir, f"frame_{frame_count:06d}.png"), frame)
+            if cache_file is not None:
+                cache_file.write(frame.tobytes())
+            
+            if not _queue_put(decode_q, (frame_count, frame), stop_event):
+                return None
+            frame_count += 1
+        
+        _queue_put(decode_q, None, stop_event)
+        return frame_count
+    
+    def _write_frames(self, encode_q, stop_event, mp4_writer, ffmpeg_proc, processed_dir, bgra_pool):
+        """
+        编码阶段：写入ffmpeg进程（生成主输出和/或WebM）与OpenCV的MP4写入器（如有），
+        可选保存处理后的帧；写完的BGRA缓冲区归还到缓冲区池
+        """
+        # OpenCV写入器的白底合成结果每帧写入同一个数组
+        bgr = None
+        while True:
+            item = _queue_get(encode_q, stop_event)
+            if item is None:
+                break
+            
+            idx, bgra = item
+            if processed_dir:
+                cv2.imwrite(os.path.join(processed_dir, f"processed_frame_{idx:06d}.png"), bgra)
+            
+            if ffmpeg_proc is not None:
+                try:
+                    # 直接写入数组内存，不再通过tobytes()复制出临时bytes
+                    ffmpeg_proc.stdin.write(bgra.data)
+                except (BrokenPipeError, OSError) as e:
+                    raise RuntimeError(f"ffmpeg编码失败: {e}") from e
+            if mp4_writer is not None:
+                bgr = composite_on_white(bgra, bgr)
+                mp4_writer.write(bgr)
+            
+            bgra_pool.put(bgra)
+    
+    def _run_pipeline(self, input_video, output_dir, max_frames, create_webm, cache_interval,
+                      batch_size, frames_dir=None, processed_dir=None, frame_cache=None,
+                      webm_preset='quality', sample_frames=False, cancel_event=None,
+                      progress_callback=None, skip_static=False, alpha_codec=None,
+                      motion_threshold=0.0):
+        """
+        以流水线方式处理视频：解码线程、推理（当前线程）、编码线程
+        通过有界队列连接，三个阶段同时运行，帧数据全程保留在内存中
+        
+        Returns:
+            tuple: (帧数, fps, 视频宽度, 视频高度, MP4路径, WebM路径, 是否被取消)
+        """
+        for frames_path in (frames_dir, processed_dir):
+            if frames_path:
+                os.makedirs(frames_path, exist_ok=True)
+        
+        cap = None
+        cache_key = None
+        cache_file = None
+        cached = None
+        # 帧数组池：推理阶段合成完后归还，解码阶段优先复用，数量不超过同时在途的帧数
+        frame_pool = None
+        if frame_cache is not None:
+            cache_key = FrameCache.make_key(input_video, max_frames, sample_frames)
+            cached = frame_cache.load(cache_key)
+        
+        if cached is not None:
+            # 命中帧缓存，跳过解码
+            frames, info = cached
+            fps, width, height = info['fps'], info['width'], info['height']
+            total_frames = info['frame_count']
+            logger.info(f"使用帧缓存: {total_frames}帧, {fps}fps, {width}x{height}")
+        else:
+            # 打开视频
+            cap, fps, total_frames, width, height = self._open_capture(input_video)
+            logger.info(f"视频信息: {total_frames}帧, {fps}fps, {width}x{height}")
+            
+            keep_indices = None
+            if max_frames and max_frames < total_frames:
+                if sample_frames:
+                    # 在整段视频中均匀选取 max_frames 帧，按比例降低输出帧率以保持时长
+                    indices = np.rint(np.linspace(0, total_frames - 1, max_frames)).astype(np.int64)
+                    keep_indices = frozenset(indices.tolist())
+                    fps = fps * max_frames / total_frames
+                    logger.info(f"均匀抽帧: 从 {total_frames} 帧中选取 {max_frames} 帧，输出帧率 {fps:.2f}fps")
+                total_frames = max_frames
+                logger.info(f"限制处理帧数为: {max_frames}")
+            
+            if isinstance(cap, cv2.VideoCapture):
+                frame_pool = queue.SimpleQueue()
+            frames = self._iter_capture(cap, max_frames, keep_indices, frame_pool)
+        
+        # 创建输出视频：主输出和WebM由同一个ffmpeg进程同时编码，
+        # ffmpeg或H.264编码器不可用时主输出退回OpenCV的mp4v编码
+        output_mp4 = os.path.join(output_dir, 'output_transparent.mp4')
+        output_webm = None
+        mp4_writer = None
+        ffmpeg_proc = None
+        ffmpeg_output = None
+        if alpha_codec is not None:
+            ffmpeg_output = os.path.join(output_dir, 'output_transparent' + ALPHA_CODECS[alpha_codec][2])
+        elif _h264_encoder_args() is not None:
+            ffmpeg_output = output_mp4
+        else:
+            logger.warning("ffmpeg没有可用的H.264编码器，MP4使用mp4v编码")
+        if create_webm:
+            # WebM与主输出由同一个ffmpeg进程编码，WebM编码失败会连带主输出，先检查编码条件
+            if webm_preset not in WEBM_PRESETS:
+                logger.warning(f"未知的WebM编码预设 {webm_preset}，跳过WebM")
+            elif 'libvpx-vp9' not in _ffmpeg_encoders():
+                logger.warning("ffmpeg不可用或不支持libvpx-vp9编码，跳过WebM")
+            else:
+                output_webm = os.path.join(output_dir, 'output_transparent.webm')
+        if ffmpeg_output or output_webm:
+            ffmpeg_proc = self._open_ffmpeg_writer(ffmpeg_output, output_webm, fps, width, height,
+                                                   webm_preset, alpha_codec)
+        if ffmpeg_proc is None:
+            ffmpeg_output = None
+            output_webm = None
+            if alpha_codec is not None:
+                logger.warning("输出带透明通道的视频需要ffmpeg，改为输出白底MP4")
+        elif ffmpeg_output:
+            output_mp4 = ffmpeg_output
+        
+        if ffmpeg_output is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            mp4_writer = cv2.VideoWriter(output_mp4, fourcc, fps, (width, height), True)
+            if not mp4_writer.isOpened():
+                if cap is not None:
+                    cap.release()
+                if ffmpeg_proc is not None:
+                    ffmpeg_proc.kill()
+                    ffmpeg_proc.wait()
+                logger.error("无法创建视频写入器")
+                raise ValueError("无法创建视频文件")
+        
+        if cap is not None and frame_cache is not None:
+            cache_file = frame_cache.open_writer(cache_key)
+        
+        decode_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        encode_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        # BGRA缓冲区池：编码阶段用完后归还，推理阶段优先复用，数量不超过同时在途的帧数
+        bgra_pool = queue.SimpleQueue()
+        stop_event = threading.Event()
+        errors = []
+        stage_results = {}
+        
+        def run_stage(name, target, *args):
+            try:
+                stage_results[name] = target(*args)
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+        
+        reader = threading.Thread(target=run_stage, daemon=True,
+                                  args=('reader', self._read_frames, frames, decode_q, stop_event,
+                                        frames_dir, cache_file))
+        writer = threading.Thread(target=run_stage, daemon=True,
+                                  args=('writer', self._write_frames, encode_q, stop_event,
+                                        mp4_writer, ffmpeg_proc, processed_dir, bgra_pool))
+        reader.start()
+        writer.start()
+        
+        # 推理阶段：每次攒够一批帧后统一推理
+        mask_cache = TemporalMaskCache(cache_interval,
+                                       dhash_threshold=DHASH_SKIP_THRESHOLD if skip_static else 0,
+                                       motion_threshold=motion_threshold)
+        input_buffer = self.new_input_buffer(batch_size)
+        frame_count = 0
+        inferred = 0
+        cancelled = False
+        reported_count = 0
+        reported_time = time.monotonic()
+        throughput = ThroughputWindow()
+        throughput.add(reported_time, 0)
+        try:
+            with tqdm(total=total_frames, desc="移除背景", mininterval=PROGRESS_BAR_MININTERVAL) as pbar:
+                finished = False
+                while not finished:
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        break
+                    
+                    batch = []
+                    while len(batch) < batch_size:
+                        item = _queue_get(decode_q, stop_event)
+                        if item is None:
+                            finished = True
+                            break
+                        batch.append(item)
+                    
+                    keyframes = [mask_cache.is_keyframe(frame) for _, frame in batch]
+                    masks = iter(self.predict_masks(
+                        [frame for (_, frame), is_key in zip(batch, keyframes) if is_key],
+                        input_buffer
+                    ))
+                    inferred += sum(keyframes)
+                    
+                    batch_start = frame_count
+                    for (idx, frame), is_key in zip(batch, keyframes):
+                        if is_key:
+                            mask_cache.mask = next(masks)
+                        try:
+                            bgra = bgra_pool.get_nowait()
+                        except queue.Empty:
+                            bgra = np.empty((frame.shape[0], frame.shape[1], 4), dtype=np.uint8)
+                        apply_alpha(frame, mask_cache.mask, bgra)
+                        if frame_pool is not None:
+                            frame_pool.put(frame)
+                        if not _queue_put(encode_q, (idx, bgra), stop_event):
+                            finished = True
+                            break
+                        frame_count += 1
+                    # 每批更新一次进度条
+                    pbar.update(frame_count - batch_start)
+                    
+                    if progress_callback is not None:
+                        now = time.monotonic()
+                        throughput.add(now, frame_count)
+                        if (frame_count - reported_count >= PROGRESS_REPORT_FRAMES
+                                or now - reported_time >= PROGRESS_REPORT_INTERVAL):
+                            progress_callback(frame_count, total_frames, throughput.fps())
+                            reported_count = frame_count
+                            reported_time = now
+            
+            if progress_callback is not None and frame_count != reported_count:
+                progress_callback(frame_count, total_frames, throughput.fps())
+            _queue_put(encode_q, None, stop_event)
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            if cancelled:
+                # 取消时先让编码线程写完已处理的帧，再通知解码线程退出
+                writer.join()
+                stop_event.set()
+            reader.join()
+            writer.join()
+            if cap is not None:
+                cap.release()
+            if mp4_writer is not None:
+                mp4_writer.release()
+            if ffmpeg_proc is not None:
+                try:
+                    ffmpeg_proc.stdin.close()
+                except OSError:
+                    pass
+                ffmpeg_proc.wait()
+        
+        if cache_file is not None:
+            decoded = stage_results.get('reader')
+            if errors or not decoded:
+                frame_cache.discard(cache_file)
+            else:
+                frame_cache.commit(cache_key, cache_file, {
+                    'fps': fps, 'width': width, 'height': height, 'frame_count': decoded
+                })
+        
+        if errors:
+            raise errors[0]
+        
+        if ffmpeg_proc is not None and ffmpeg_proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg编码失败: 返回码 {ffmpeg_proc.returncode}")
+        
+        if cancelled:
+            logger.warning(f"处理已停止，已处理 {frame_count} 帧")
+        else:
+            logger.info(f"成功处理 {frame_count} 帧 (模型推理 {inferred} 次)")
+        return frame_count, fps, width, height, output_mp4, output_webm, cancelled
+    
+    def process_video(self, input_video, output_dir, max_frames=None, create_webm=True,
+                      cache_interval=1, batch_size=8, save_intermediate=False, frame_cache_dir=None,
+                      webm_preset='quality', sample_frames=False, cancel_event=None,
+                      progress_callback=None, skip_static=False, alpha_codec=None,
+                      motion_threshold=0.0):
         """
         完整的视频处理流程
         
@@ -259,6 +1615,21 @@ class VideoBackgroundRemover:
             output_dir (str): 输出目录
             max_frames (int): 最大处理帧数
             create_webm (bool): 是否创建WebM格式
+            cache_interval (int): 遮罩复用的关键帧间隔，1表示每帧都运行模型
+            batch_size (int): 每次模型推理的帧数
+            save_intermediate (bool): 是否保存原始帧和处理后的帧图片（用于调试）
+            frame_cache_dir (str): 解码帧缓存目录，重复处理同一视频时跳过解码
+            webm_preset (str): VP9编码预设，quality（高质量）或 fast（实时编码）
+            sample_frames (bool): 设置max_frames时在整段视频中均匀抽帧，而不是只取开头的帧
+            cancel_event (threading.Event): 取消信号，置位后停止处理，已处理的帧仍会写入输出视频
+            progress_callback (callable): 进度回调 callback(已处理帧数, 总帧数, 最近的处理速度fps)，
+                每 PROGRESS_REPORT_FRAMES 帧或 PROGRESS_REPORT_INTERVAL 秒最多调用一次
+            skip_static (bool): 画面与关键帧几乎相同（dHash）时复用遮罩，跳过模型推理，
+                适合固定机位的讲解、录屏类视频
+            alpha_codec (str): 主输出保留透明通道的编码（见 ALPHA_CODECS），
+                为None时主输出为白底合成的MP4
+            motion_threshold (float): 与关键帧的缩略灰度图平均绝对差（0-255）低于该值时复用遮罩，
+                适合讲解类等低运动视频，0表示不启用
             
         Returns:
             dict: 处理结果信息
@@ -268,29 +1639,21 @@ class VideoBackgroundRemover:
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         
+        frames_dir = None
+        processed_dir = None
+        if save_intermediate:
+            frames_dir = os.path.join(output_dir, 'frames')
+            processed_dir = os.path.join(output_dir, 'processed_frames')
+        
         try:
-            # 1. 提取帧
-            frame_count, fps, width, height, frames_list = self.extract_frames(
-                input_video, output_dir, max_frames
+            # 解码 -> 推理 -> 编码 三个阶段并行执行
+            frame_count, fps, width, height, output_mp4, output_webm, cancelled = self._run_pipeline(
+                input_video, output_dir, max_frames, create_webm, cache_interval, batch_size,
+                frames_dir, processed_dir,
+                FrameCache(frame_cache_dir) if frame_cache_dir else None, webm_preset, sample_frames,
+                cancel_event, progress_callback, skip_static, alpha_codec, motion_threshold
             )
             
-            # 2. 处理帧（移除背景）
-            processed_frames = self.process_frames(frames_list, output_dir)
-            
-            # 3. 创建输出视频
-            output_mp4 = os.path.join(output_dir, 'output_transparent.mp4')
-            self.create_transparent_video(processed_frames, output_mp4, fps, width, height)
-            
-            # 4. 可选：创建WebM格式（更好的透明度支持）
-            output_webm = None
-            if create_webm:
-                output_webm = os.path.join(output_dir, 'output_transparent.webm')
-                try:
-                    self.create_webm_with_transparency(processed_frames, output_webm, fps)
-                except Exception as e:
-                    logger.warning(f"WebM创建失败: {e}")
-                    output_webm = None
-            
             # 返回结果信息
             result = {
                 'input_video': input_video,
@@ -300,33 +1663,146 @@ class VideoBackgroundRemover:
                 'resolution': (width, height),
                 'output_mp4': output_mp4,
                 'output_webm': output_webm,
-                'frames_dir': os.path.join(output_dir, 'frames'),
-                'processed_frames_dir': os.path.join(output_dir, 'processed_frames')
+                'frames_dir': frames_dir,
+                'processed_frames_dir': processed_dir,
+                'cancelled': cancelled
             }
             
-            logger.info("视频处理完成！")
-            logger.info(f"输出MP4: {output_mp4}")
+            logger.info("视频处理已停止" if cancelled else "视频处理完成！")
+            logger.info(f"输出视频: {output_mp4}")
             if output_webm:
                 logger.info(f"输出WebM: {output_webm}")
-            logger.info(f"原始帧目录: {result['frames_dir']}")
-            logger.info(f"处理后帧目录: {result['processed_frames_dir']}")
+            if save_intermediate:
+                logger.info(f"原始帧目录: {frames_dir}")
+                logger.info(f"处理后帧目录: {processed_dir}")
             
             return result
             
         except Exception as e:
             logger.error(f"视频处理失败: {e}")
             raise
+    
+    def run_daemon(self, output_dir, input_stream=None, **kwargs):
+        """
+        常驻模式：逐行读取视频路径并依次处理，模型只加载一次
+        
+        每个视频输出到 output_dir/<视频文件名> 目录，处理完一个视频向标准输出写一行JSON结果，
+        便于其他程序通过管道调用；单个视频失败不影响后续视频
+        
+        Args:
+            output_dir (str): 输出根目录
+            input_stream (iterable): 视频路径来源，默认为标准输入
+            **kwargs: 传给 process_video 的其他参数
+            
+        Returns:
+            int: 处理失败的视频数
+        """
+        logger.info("常驻模式已启动，每行输入一个视频路径（EOF结束）")
+        failed = 0
+        for line in input_stream if input_stream is not None else sys.stdin:
+            video_path = line.strip()
+            if not video_path:
+                continue
+            
+            status = {'input': video_path, 'ok': False}
+            if not os.path.exists(video_path):
+                logger.error(f"输入文件不存在: {video_path}")
+                status['error'] = '输入文件不存在'
+            else:
+                try:
+                    result = self.process_video(video_path, os.path.join(output_dir, Path(video_path).stem),
+                                                **kwargs)
+                    status.update(ok=True, output_mp4=result['output_mp4'],
+                                  output_webm=result['output_webm'], frame_count=result['frame_count'])
+                except Exception as e:
+                    status['error'] = str(e)
+            
+            if not status['ok']:
+                failed += 1
+            print(json.dumps(status, ensure_ascii=False), flush=True)
+        
+        return failed
+
+# process_frames 多进程处理时，每个工作进程持有的背景移除器
+_frame_worker_remover = None
+
+def _init_frame_worker(model_name, quantize, n_jobs):
+    """进程池初始化：按进程数平分推理线程，并在进程内加载一次模型"""
+    global _frame_worker_remover
+    os.environ['OMP_NUM_THREADS'] = str(max(1, (os.cpu_count() or 1) // n_jobs))
+    _frame_worker_remover = VideoBackgroundRemover(model_name=model_name, quantize=quantize)
+
+def _process_frame_chunk_worker(frames_list, start, processed_dir, cache_interval,
+                                dhash_threshold, batch_size, motion_threshold):
+    """在工作进程中处理一段连续的帧"""
+    remover = _frame_worker_remover
+    return remover._process_frame_chunk(
+        frames_list, start, processed_dir,
+        TemporalMaskCache(cache_interval, dhash_threshold=dhash_threshold,
+                          motion_threshold=motion_threshold),
+        batch_size, remover.new_input_buffer(batch_size)
+    )
+
+_remover_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=4)
+def _cached_remover(model_name, quantize, device, fp16):
+    return VideoBackgroundRemover(model_name=model_name, quantize=quantize, device=device, fp16=fp16)
+
+def get_remover(model_name='u2net', quantize=False, device='cpu', fp16=False):
+    """
+    获取共享的背景移除器，同一进程内相同模型只加载一次
+    
+    Args:
+        model_name (str): 使用的模型名称
+        quantize (bool): 是否使用INT8动态量化模型
+        device (str): 推理设备，见 DEVICE_CHOICES
+        fp16 (bool): 硬件加速推理时是否使用FP16模型
+        
+    Returns:
+        VideoBackgroundRemover: 已初始化的背景移除器
+    """
+    # auto 先解析为实际设备，与直接指定该设备共用同一个缓存项
+    device = resolve_device(device)
+    # 加锁避免多个线程同时加载同一个模型
+    with _remover_lock:
+        return _cached_remover(model_name, quantize, device, fp16)
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='视频背景移除工具')
-    parser.add_argument('-i', '--input', required=True, help='输入视频路径')
+    parser.add_argument('-i', '--input', help='输入视频路径')
     parser.add_argument('-o', '--output', required=True, help='输出目录')
     parser.add_argument('-m', '--model', default='u2net', 
                        choices=['u2net', 'u2netp', 'u2net_human_seg', 'isnet-general-use', 'silueta'],
                        help='背景移除模型')
     parser.add_argument('-f', '--max-frames', type=int, help='最大处理帧数')
+    parser.add_argument('--sample-frames', action='store_true',
+                       help='配合 -f 使用：在整段视频中均匀抽帧，而不是只处理开头的帧')
     parser.add_argument('--no-webm', action='store_true', help='不创建WebM格式')
+    parser.add_argument('--cache-interval', type=int, default=1,
+                       help='遮罩复用的关键帧间隔 (1表示每帧都运行模型)')
+    parser.add_argument('--skip-static', action='store_true',
+                       help='画面几乎不变的帧复用上一次的遮罩（适合固定机位、录屏视频）')
+    parser.add_argument('--motion-threshold', type=float, default=0.0,
+                       help='与关键帧的缩略图平均绝对差 (0-255) 低于该值时复用遮罩，'
+                            '适合讲解类低运动视频 (如 2.0，默认0不启用)')
+    parser.add_argument('-b', '--batch-size', type=int, default=8, help='每次模型推理的帧数')
+    parser.add_argument('--save-intermediate', '--debug-dump', action='store_true',
+                       help='保存原始帧和处理后的帧图片（用于调试）')
+    parser.add_argument('--frame-cache-dir', help='解码帧缓存目录，重复处理同一视频时跳过解码')
+    parser.add_argument('--device', default='cpu', choices=DEVICE_CHOICES,
+                       help='推理设备 (auto 自动选择可用的CUDA/CoreML/DirectML后端)')
+    parser.add_argument('--int8', action='store_true', help='使用INT8量化模型加速CPU推理')
+    parser.add_argument('--fp16', action='store_true',
+                       help='硬件加速推理时使用FP16模型 (需要安装onnxconverter-common)')
+    parser.add_argument('--webm-preset', default='quality', choices=list(WEBM_PRESETS),
+                       help='WebM编码预设 (fast 为VP9实时模式，速度更快)')
+    parser.add_argument('--alpha-codec', choices=list(ALPHA_CODECS),
+                       help='主输出保留透明通道：prores 输出ProRes 4444 (.mov)，'
+                            'hevc 输出带透明通道的H.265 MP4 (需要ffmpeg 7.1+)；默认输出白底MP4')
+    parser.add_argument('--daemon', action='store_true',
+                       help='常驻模式：从标准输入逐行读取视频路径，模型只加载一次，结果输出到 -o/<视频名>')
     parser.add_argument('-v', '--verbose', action='store_true', help='详细输出')
     
     args = parser.parse_args()
@@ -334,22 +1810,38 @@ def main():
     if args.verbose:
         logger.setLevel(logging.DEBUG)
     
-    # 检查输入文件
-    if not os.path.exists(args.input):
-        logger.error(f"输入文件不存在: {args.input}")
-        return 1
+    if not args.daemon:
+        # 检查输入文件
+        if not args.input:
+            parser.error('需要指定输入视频 -i，或使用 --daemon 从标准输入读取')
+        if not os.path.exists(args.input):
+            logger.error(f"输入文件不存在: {args.input}")
+            return 1
+    
+    process_kwargs = dict(
+        max_frames=args.max_frames,
+        create_webm=not args.no_webm,
+        cache_interval=args.cache_interval,
+        batch_size=args.batch_size,
+        save_intermediate=args.save_intermediate,
+        frame_cache_dir=args.frame_cache_dir,
+        webm_preset=args.webm_preset,
+        sample_frames=args.sample_frames,
+        skip_static=args.skip_static,
+        motion_threshold=args.motion_threshold,
+        alpha_codec=args.alpha_codec
+    )
     
     try:
         # 创建处理器
-        remover = VideoBackgroundRemover(model_name=args.model)
+        remover = VideoBackgroundRemover(model_name=args.model, quantize=args.int8, device=args.device,
+                                         fp16=args.fp16)
+        
+        if args.daemon:
+            return 1 if remover.run_daemon(args.output, **process_kwargs) else 0
         
         # 处理视频
-        result = remover.process_video(
-            input_video=args.input,
-            output_dir=args.output,
-            max_frames=args.max_frames,
-            create_webm=not args.no_webm
-        )
+        result = remover.process_video(input_video=args.input, output_dir=args.output, **process_kwargs)
         
         logger.info("\n=== 处理完成 ===")
         logger.info(f"处理帧数: {result['frame_count']}")